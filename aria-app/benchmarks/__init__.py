@@ -0,0 +1 @@
+"""Benchmarks for the ARIA server."""
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Concurrent booking benchmark.
+
+Many clients race to book the same few slots in a handful of rooms through
+BookingService, then the database is checked for overlapping active
+bookings. Reports throughput, latency and outcome counts; --no-lock runs
+the old check-then-insert path for comparison.
+
+Row locks need a database that honours SELECT ... FOR UPDATE (MySQL/InnoDB).
+On SQLite the lock is a no-op and writers are serialised by the file lock
+instead, so results there say little about production. Each attempt reads
+the database before booking, as a web request's user loader does, so on
+InnoDB a conflict re-check that reuses that earlier snapshot shows up as
+double bookings.
+
+Usage (from aria-app/):
+    python -m benchmarks.booking_contention [--clients 16] [--attempts 25] [--rooms 2]
+        [--slots 6] [--database-url URL] [--no-lock] [--keep]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+ROOM_PREFIX = 'Contention Bench'
+
+
+def book_without_lock(booking_service, db, RoomBooking, room_id: int, start: datetime, end: datetime):
+    """The pre-locking path: check availability, then insert in a separate step."""
+    if booking_service._has_conflict(room_id, start, end):
+        return None
+    booking = RoomBooking(RoomID=room_id, Start=start, End=end, Purpose='benchmark', RBookStatus='Upcoming')
+    db.session.add(booking)
+    db.session.commit()
+    return booking
+
+
+def run_client(app, room_ids: List[int], slots: List[datetime], attempts: int, use_lock: bool,
+               results: List[Dict], seed: int):
+    """Book random room/slot pairs, recording each attempt's outcome and latency."""
+    from website.models.base import db
+    from website.models.room import RoomList, RoomBooking
+    from website.services.booking_service import BookingService
+    
+    rng = random.Random(seed)
+    with app.app_context():
+        for _ in range(attempts):
+            room_id = rng.choice(room_ids)
+            start = rng.choice(slots)
+            end = start + timedelta(hours=1)
+            began = time.perf_counter()
+            try:
+                # Opens the transaction (and, on InnoDB, its read snapshot) like load_user
+                db.session.query(RoomList.RoomID).filter_by(RoomID=room_id).scalar()
+                if use_lock:
+                    booking = BookingService.create_room_booking(room_id, start=start, end=end,
+                                                                 purpose='benchmark')
+                else:
+                    booking = book_without_lock(BookingService, db, RoomBooking, room_id, start, end)
+                outcome = 'created' if booking else 'rejected'
+            except Exception as e:
+                db.session.rollback()
+                outcome = 'error'
+                logging.getLogger(__name__).debug(f"Booking attempt failed: {str(e)}")
+            results.append({'outcome': outcome, 'seconds': time.perf_counter() - began})
+            db.session.remove()
+
+
+def count_double_bookings(db, RoomBooking, room_ids: List[int]) -> int:
+    """Count pairs of active bookings in the same room that overlap."""
+    from sqlalchemy import and_
+    from sqlalchemy.orm import aliased
+    
+    other = aliased(RoomBooking)
+    return db.session.query(RoomBooking.RBookID).join(
+        other,
+        and_(
+            other.RoomID == RoomBooking.RoomID,
+            other.RBookID > RoomBooking.RBookID,
+            other.Start <= RoomBooking.End,
+            other.End >= RoomBooking.Start,
+            other.RBookStatus.in_(['Upcoming', 'Ongoing'])
+        )
+    ).filter(
+        RoomBooking.RoomID.in_(room_ids),
+        RoomBooking.RBookStatus.in_(['Upcoming', 'Ongoing'])
+    ).count()
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Race concurrent clients booking the same rooms")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent clients (threads)")
+    parser.add_argument('--attempts', type=int, default=25, help="Booking attempts per client")
+    parser.add_argument('--rooms', type=int, default=2, help="Rooms to book")
+    parser.add_argument('--slots', type=int, default=6, help="One-hour slots per room")
+    parser.add_argument('--database-url', help="Database to use (defaults to DATABASE_URL / config)")
+    parser.add_argument('--no-lock', action='store_true', help="Use the unlocked check-then-insert path")
+    parser.add_argument('--keep', action='store_true', help="Keep the benchmark rooms and bookings")
+    args = parser.parse_args(argv)
+    
+    # Config reads DATABASE_URL at import time
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    
+    from website import create_app
+    from website.models.base import db
+    from website.models.room import RoomList, RoomBooking, RoomOccupancy
+    
+    logging.basicConfig(level=logging.WARNING)
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    logging.getLogger('website').setLevel(logging.ERROR)
+    
+    with app.app_context():
+        db.create_all()
+        room_ids = []
+        for i in range(1, args.rooms + 1):
+            name = f"{ROOM_PREFIX} {i}"
+            room = db.session.query(RoomList).filter_by(RoomName=name).first()
+            if room is None:
+                room = RoomList(RoomName=name, RoomType='Benchmark', RoomStatus='Available')
+                db.session.add(room)
+                db.session.flush()
+            room_ids.append(room.RoomID)
+        db.session.query(RoomBooking).filter(RoomBooking.RoomID.in_(room_ids)).delete(synchronize_session=False)
+        db.session.query(RoomOccupancy).filter(RoomOccupancy.RoomID.in_(room_ids)).delete(synchronize_session=False)
+        db.session.commit()
+    
+    # One-hour slots two hours apart a week out, so only attempts for the same
+    # room and slot collide (the overlap check treats touching bookings as overlapping)
+    day = (datetime.now() + timedelta(days=7)).replace(hour=8, minute=0, second=0, microsecond=0)
+    slots = [day + timedelta(hours=2 * i) for i in range(args.slots)]
+    
+    results: List[Dict] = []
+    threads = [
+        threading.Thread(target=run_client,
+                         args=(app, room_ids, slots, args.attempts, not args.no_lock, results, seed))
+        for seed in range(args.clients)
+    ]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    
+    with app.app_context():
+        double_bookings = count_double_bookings(db, RoomBooking, room_ids)
+        if not args.keep:
+            db.session.query(RoomBooking).filter(RoomBooking.RoomID.in_(room_ids)).delete(synchronize_session=False)
+            db.session.query(RoomOccupancy).filter(RoomOccupancy.RoomID.in_(room_ids)).delete(synchronize_session=False)
+            db.session.query(RoomList).filter(RoomList.RoomID.in_(room_ids)).delete(synchronize_session=False)
+            db.session.commit()
+    
+    counts = {outcome: sum(1 for r in results if r['outcome'] == outcome)
+              for outcome in ('created', 'rejected', 'error')}
+    latencies = sorted(r['seconds'] for r in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    
+    print(f"Mode: {'unlocked check-then-insert' if args.no_lock else 'row lock'} "
+          f"({app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0]})")
+    print(f"Clients: {args.clients}  Attempts: {len(results)}  Rooms: {args.rooms}  Slots: {args.slots}")
+    print(f"Created: {counts['created']}  Rejected: {counts['rejected']}  Errors: {counts['error']}")
+    print(f"Throughput: {len(results) / elapsed:.1f} attempts/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"Latency: median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+    print(f"Double bookings: {double_bookings}")
+    
+    return 0 if double_bookings == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,34 +1,208 @@
 """
 API Client for communicating with ARIA server.
 """
+import re
+import time
+import random
+import threading
 import requests
 import logging
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple, Union
 from datetime import datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from .config import ClientConfig
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Server errors worth retrying; other 5xx still count against the circuit breaker
+RETRY_STATUSES = (502, 503, 504)
+
+# Statuses meaning the server read the events and found them invalid
+INVALID_EVENT_STATUSES = (400, 422)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an unhealthy server.
+    
+    After failure_threshold consecutive failed calls the circuit opens and
+    calls fail immediately, so callers fall back to the local cache instead
+    of waiting out timeouts. After reset_seconds one trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+    
+    def __init__(self, failure_threshold: int = None, reset_seconds: float = None):
+        """
+        Initialize circuit breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold or ClientConfig.API_BREAKER_THRESHOLD
+        self.reset_seconds = ClientConfig.API_BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Check whether a call may be sent now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                # Let exactly one trial call through
+                self._set_state(self.HALF_OPEN)
+                return True
+            return False
+    
+    def record_success(self):
+        """Record a call that reached a healthy server."""
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                logger.info("API circuit closed; server reachable again")
+                self._set_state(self.CLOSED)
+    
+    def record_failure(self):
+        """Record a call that failed after all retries."""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                logger.warning(f"API circuit open after {self._failures} failures; "
+                               f"using local cache for {self.reset_seconds:g}s")
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+    
+    def _set_state(self, state: int):
+        self.state = state
+        metrics.set('aria_api_circuit_state', state)
+
 
 class APIClient:
     """Client for ARIA API."""
     
-    def __init__(self, base_url: str = None, timeout: int = None):
+    def __init__(self, base_url: str = None, timeout: Union[float, Tuple[float, float]] = None,
+                 retries: int = None, breaker: CircuitBreaker = None):
+        """
+        Initialize API client.
+        
+        Args:
+            base_url: ARIA API base URL
+            timeout: Read timeout, or a (connect, read) tuple, in seconds
+            retries: Extra attempts for idempotent requests
+            breaker: CircuitBreaker guarding the server (created if omitted)
+        """
         self.base_url = base_url or ClientConfig.API_BASE_URL
-        self.timeout = timeout or ClientConfig.API_TIMEOUT
+        if timeout is None:
+            timeout = ClientConfig.API_READ_TIMEOUT
+        if not isinstance(timeout, tuple):
+            timeout = (min(ClientConfig.API_CONNECT_TIMEOUT, timeout), timeout)
+        self.timeout = timeout
+        self.retries = ClientConfig.API_RETRIES if retries is None else retries
+        self.breaker = breaker or CircuitBreaker()
+        
         self.session = requests.Session()
+        # Keep-alive connections shared by the sync and outbox threads
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ClientConfig.API_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         })
+        self.session.hooks['response'].append(self._record_response)
+        self._base_path = urlparse(self.base_url).path.rstrip('/')
+    
+    def _endpoint(self, url: str) -> str:
+        """Metric label for a request URL."""
+        path = urlparse(url).path
+        if path.startswith(self._base_path):
+            path = path[len(self._base_path):]
+        # IDs in the path would give every room its own series
+        return re.sub(r'/\d+(?=/|$)', '/:id', path) or '/'
+    
+    def _record_response(self, response: requests.Response, *args, **kwargs):
+        """Record API latency (time to response headers) per endpoint."""
+        endpoint = self._endpoint(response.url)
+        metrics.observe('aria_api_request_seconds', response.elapsed.total_seconds(),
+                        method=response.request.method, endpoint=endpoint)
+        metrics.inc('aria_api_requests_total', method=response.request.method, endpoint=endpoint,
+                    status=response.status_code)
+    
+    def _send(self, method: str, url: str, idempotent: bool = False, read_timeout_factor: float = 1,
+              **kwargs) -> requests.Response:
+        """
+        Send a request through the circuit breaker.
+        
+        Idempotent requests are retried on connection errors, timeouts and
+        RETRY_STATUSES with jittered exponential backoff.
+        
+        Returns:
+            The response; callers check its status
+        
+        Raises:
+            CircuitOpenError: The server is considered down
+            requests.exceptions.RequestException: The request failed after all attempts
+        """
+        if not self.breaker.allow():
+            metrics.inc('aria_api_short_circuits_total', method=method, endpoint=self._endpoint(url))
+            raise CircuitOpenError(f"API circuit open; not sending {method} {url}")
+        
+        connect_timeout, read_timeout = self.timeout
+        timeout = (connect_timeout, read_timeout * read_timeout_factor)
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                # 4xx means the server is up; the caller handles it
+                self.breaker.record_success()
+                return response
+            except requests.exceptions.RequestException as e:
+                error = e
+                metrics.inc('aria_api_errors_total', method=method, endpoint=self._endpoint(url),
+                            error=type(e).__name__)
+                # Anything else (bad URL, redirect loop, broken body) won't fix itself on retry
+                if not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                      requests.exceptions.HTTPError)):
+                    break
+                if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code not in RETRY_STATUSES:
+                    break
+            except Exception:
+                # Never leave a half-open breaker waiting on a trial call that died
+                self.breaker.record_failure()
+                raise
+            
+            if attempt + 1 < attempts:
+                metrics.inc('aria_api_retries_total', method=method, endpoint=self._endpoint(url))
+                delay = min(ClientConfig.API_RETRY_MAX_SECONDS,
+                            ClientConfig.API_RETRY_BASE_SECONDS * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+        
+        self.breaker.record_failure()
+        raise error
     
-    def _get(self, endpoint: str) -> Optional[Dict]:
+    def _get(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
         """Make GET request."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         try:
-            response = self.session.get(url, timeout=self.timeout)
+            response = self._send('GET', url, idempotent=True, params=params)
             response.raise_for_status()
             return response.json()
+        except CircuitOpenError:
+            return None
         except requests.exceptions.RequestException as e:
             logger.error(f"GET request failed for {url}: {str(e)}")
             return None
@@ -37,9 +211,11 @@ class APIClient:
         """Make POST request."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         try:
-            response = self.session.post(url, json=data, timeout=self.timeout)
+            response = self._send('POST', url, json=data)
             response.raise_for_status()
             return True
+        except CircuitOpenError:
+            return False
         except requests.exceptions.RequestException as e:
             logger.error(f"POST request failed for {url}: {str(e)}")
             return False
@@ -64,11 +240,34 @@ class APIClient:
         result = self._get('rbooklists')
         return result if result else []
     
+    def get_room_booking_changes(self, room_id: int, window_start: datetime, window_end: datetime,
+                                 updated_since: str = None) -> Optional[Dict]:
+        """
+        Get booking changes for one room.
+        
+        Args:
+            room_id: Room ID
+            window_start: Start of the booking window
+            window_end: End of the booking window
+            updated_since: Cursor returned by the previous call, or None for a full window fetch
+        
+        Returns:
+            Dict with bookings, active_ids, users and cursor, or None if the request failed
+        """
+        params = {
+            'start': window_start.strftime("%Y-%m-%dT%H:%M:%S"),
+            'end': window_end.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        if updated_since:
+            params['updated_since'] = updated_since
+        
+        return self._get(f'rooms/{room_id}/bookings', params=params)
+    
     def get_face_database(self, save_path: str) -> bool:
         """Download face database file."""
         url = f"{self.base_url}/faces"
         try:
-            response = self.session.get(url, timeout=self.timeout * 2, stream=True)
+            response = self._send('GET', url, idempotent=True, read_timeout_factor=2, stream=True)
             response.raise_for_status()
             
             with open(save_path, 'wb') as f:
@@ -85,7 +284,7 @@ class APIClient:
         """Download face embeddings file."""
         url = f"{self.base_url}/facesembeds"
         try:
-            response = self.session.get(url, timeout=self.timeout * 2, stream=True)
+            response = self._send('GET', url, idempotent=True, read_timeout_factor=2, stream=True)
             response.raise_for_status()
             
             with open(save_path, 'wb') as f:
@@ -98,6 +297,11 @@ class APIClient:
             logger.error(f"Failed to download face embeddings: {str(e)}")
             return False
     
+    def get_gallery_version(self) -> Optional[str]:
+        """Get the server's face gallery version, or None if unavailable."""
+        result = self._get('facesversion')
+        return result.get('version') if result else None
+    
     def log_access(self, room_id: int, stud_id: str = None, staff_id: str = None, 
                    status: int = 1, timestamp: str = None) -> bool:
         """
@@ -123,3 +327,29 @@ class APIClient:
         
         return self._post('accesslogs', data)
 
+    def log_access_batch(self, events: List[Dict]) -> Optional[bool]:
+        """
+        Log many room access events in one request.
+
+        Args:
+            events: Access events (RoomID, StudID, StaffID, Status, Timestamp)
+        
+        Returns:
+            True if stored, False if the server rejected the events as invalid,
+            None if the batch was not stored for any other reason (safe to retry)
+        """
+        url = f"{self.base_url}/accesslogs/batch"
+        try:
+            # Not retried here: the outbox backs off and resends the same events
+            response = self._send('POST', url, json={'events': events})
+            if response.status_code in INVALID_EVENT_STATUSES:
+                logger.error(f"Access log batch rejected ({response.status_code}): {response.text}")
+                return False
+            # Auth, missing endpoint, rate limits etc. say nothing about the events; keep them
+            if response.status_code >= 400:
+                logger.error(f"Access log batch not accepted ({response.status_code}): {response.text}")
+                return None
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.error(f"POST request failed for {url}: {str(e)}")
+            return None
@@ -0,0 +1,119 @@
+"""
+Indexed booking timeline for fast current/next booking lookups.
+"""
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from typing import Optional, Dict, List, Iterable, Tuple
+
+# Sort key for a booking: (start, booking_id). Ties on start stay ordered by ID.
+TimelineKey = Tuple[datetime, int]
+
+
+class _RoomTimeline:
+    """Bookings of one room sorted by start time."""
+    
+    __slots__ = ('keys', 'ends', 'bookings')
+    
+    def __init__(self):
+        self.keys: List[TimelineKey] = []
+        self.ends: List[datetime] = []
+        self.bookings: List[Dict] = []
+    
+    def insert(self, key: TimelineKey, end: datetime, booking: Dict):
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.ends.insert(index, end)
+        self.bookings.insert(index, booking)
+    
+    def remove(self, key: TimelineKey):
+        index = bisect_right(self.keys, key) - 1
+        if index >= 0 and self.keys[index] == key:
+            del self.keys[index]
+            del self.ends[index]
+            del self.bookings[index]
+    
+    def current(self, now: datetime) -> Optional[Dict]:
+        # Bookings in a room never overlap, so only the latest one that has
+        # started can cover now
+        index = bisect_right(self.keys, (now, float('inf'))) - 1
+        if index >= 0 and now < self.ends[index]:
+            return self.bookings[index]
+        return None
+    
+    def next_upcoming(self, now: datetime) -> Optional[Dict]:
+        index = bisect_right(self.keys, (now, float('inf')))
+        if index < len(self.keys):
+            return self.bookings[index]
+        return None
+
+
+class BookingTimeline:
+    """
+    Per-room sorted interval index over cached bookings.
+    
+    Lookups are O(log n) in the room's bookings; updates shift one list slot.
+    Bookings are dicts in the API/cache format with normalized ISO timestamps.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[int, _RoomTimeline] = {}
+        self._index: Dict[int, Tuple[int, TimelineKey]] = {}  # booking_id -> (room_id, key)
+    
+    def load(self, bookings: Iterable[Dict]):
+        """Replace the timeline contents."""
+        with self._lock:
+            self._rooms.clear()
+            self._index.clear()
+            for booking in bookings:
+                self._upsert(booking)
+    
+    def upsert(self, booking: Dict):
+        """Insert or move a booking."""
+        with self._lock:
+            self._upsert(booking)
+    
+    def remove(self, booking_id: int):
+        """Remove a booking if present."""
+        with self._lock:
+            self._remove(booking_id)
+    
+    def retain(self, room_id: int, booking_ids: Iterable[int]):
+        """Remove every booking of a room whose ID is not in booking_ids."""
+        keep = set(booking_ids)
+        with self._lock:
+            stale = [
+                booking_id for booking_id, (booking_room, _) in self._index.items()
+                if booking_room == room_id and booking_id not in keep
+            ]
+            for booking_id in stale:
+                self._remove(booking_id)
+    
+    def current(self, room_id: int, now: datetime) -> Optional[Dict]:
+        """Get the booking covering now, or None."""
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return room.current(now) if room else None
+    
+    def next_upcoming(self, room_id: int, now: datetime) -> Optional[Dict]:
+        """Get the first booking starting after now, or None."""
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return room.next_upcoming(now) if room else None
+    
+    def _upsert(self, booking: Dict):
+        booking_id = booking['BookingID']
+        self._remove(booking_id)
+        
+        room_id = booking['RoomID']
+        key = (datetime.fromisoformat(booking['Start']), booking_id)
+        end = datetime.fromisoformat(booking['End'])
+        self._rooms.setdefault(room_id, _RoomTimeline()).insert(key, end, booking)
+        self._index[booking_id] = (room_id, key)
+    
+    def _remove(self, booking_id: int):
+        entry = self._index.pop(booking_id, None)
+        if entry:
+            room_id, key = entry
+            self._rooms[room_id].remove(key)
@@ -0,0 +1,153 @@
+"""
+Long-lived camera capture with a preallocated ring buffer.
+"""
+import threading
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .config import ClientConfig
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CameraService:
+    """
+    Keeps the camera open and captures continuously on a background thread.
+    
+    Frames are decoded straight into a preallocated ring buffer
+    (cap.read(image=slot)), so steady-state capture allocates nothing.
+    Consumers copy the newest frame into their own reusable buffer with
+    read_latest().
+    """
+    
+    def __init__(self, camera_index: int = None, fourcc: str = None, buffer_size: int = None,
+                 capture_factory=cv2.VideoCapture):
+        """
+        Initialize camera service.
+        
+        Args:
+            camera_index: OpenCV camera index
+            fourcc: Camera pixel format (e.g. 'MJPG')
+            buffer_size: Number of frames kept in the ring buffer (at least 2)
+            capture_factory: Callable returning a cv2.VideoCapture-like object
+        """
+        self.camera_index = ClientConfig.CAMERA_INDEX if camera_index is None else camera_index
+        self.fourcc = fourcc or ClientConfig.CAMERA_FOURCC
+        self.buffer_size = max(2, buffer_size or ClientConfig.CAMERA_BUFFER_SIZE)
+        self.capture_factory = capture_factory
+        
+        self._cap = None
+        self._ring: Optional[np.ndarray] = None
+        self._latest_slot = -1
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether the capture thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    @property
+    def frame_shape(self) -> Optional[tuple]:
+        """Shape of captured frames, once the camera has started."""
+        return self._ring.shape[1:] if self._ring is not None else None
+    
+    def start(self) -> bool:
+        """
+        Open the camera and start capturing.
+        
+        Returns:
+            True if the camera delivered a first frame
+        """
+        if self.running:
+            return True
+        
+        cap = self.capture_factory(self.camera_index)
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        ret, frame = cap.read()
+        if not ret:
+            logger.error(f"Camera {self.camera_index} did not deliver a frame")
+            cap.release()
+            return False
+        
+        self._cap = cap
+        self._ring = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+        self._ring[0] = frame
+        with self._cond:
+            self._latest_slot = 0
+            # Keep counting across restarts so readers' after_seq stays valid
+            self._seq += 1
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'camera-{self.camera_index}', daemon=True)
+        self._thread.start()
+        logger.info(f"Camera {self.camera_index} started ({frame.shape[1]}x{frame.shape[0]}, "
+                    f"{self.buffer_size} frame buffer)")
+        return True
+    
+    def stop(self):
+        """Stop capturing and release the camera."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        with self._cond:
+            self._cond.notify_all()
+        logger.info(f"Camera {self.camera_index} stopped")
+    
+    def new_frame_buffer(self) -> np.ndarray:
+        """Allocate a buffer for read_latest(); call once and reuse it."""
+        return np.empty_like(self._ring[0])
+    
+    def read_latest(self, out: np.ndarray, after_seq: int = 0, timeout: float = 1.0) -> int:
+        """
+        Copy the newest frame into out.
+        
+        Args:
+            out: Buffer from new_frame_buffer()
+            after_seq: Wait for a frame newer than this sequence number
+            timeout: Seconds to wait for a new frame
+        
+        Returns:
+            Sequence number of the copied frame, or 0 if none arrived in time
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq or self._stop.is_set(), timeout):
+                return 0
+            if self._seq <= after_seq:
+                return 0
+            np.copyto(out, self._ring[self._latest_slot])
+            return self._seq
+    
+    def _run(self):
+        """Capture loop."""
+        while not self._stop.is_set():
+            # The writer never touches the slot readers copy from
+            slot = (self._latest_slot + 1) % self.buffer_size
+            target = self._ring[slot]
+            with metrics.timer('aria_stage_seconds', stage='capture', camera=self.camera_index):
+                ret, frame = self._cap.read(target)
+            if not ret:
+                logger.warning(f"Camera {self.camera_index} read failed")
+                self._stop.wait(0.5)
+                continue
+            if frame is not target:
+                # Backend returned a new array (e.g. resolution changed mid-stream)
+                if frame.shape != target.shape:
+                    logger.warning(f"Camera {self.camera_index} frame shape changed; dropping frame")
+                    continue
+                np.copyto(target, frame)
+            
+            with self._cond:
+                self._latest_slot = slot
+                self._seq += 1
+                self._cond.notify_all()
@@ -3,6 +3,7 @@ Configuration for ARIA Edge Device Client.
 """
 import os
 from pathlib import Path
+from typing import List, Tuple
 
 
 class ClientConfig:
@@ -10,28 +11,99 @@ class ClientConfig:
     
     # API Configuration
     API_BASE_URL = os.environ.get('ARIA_API_URL', 'http://localhost:5000/api')
-    API_TIMEOUT = int(os.environ.get('API_TIMEOUT', '30'))
+    API_CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', '3'))
+    API_READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', os.environ.get('API_TIMEOUT', '10')))
+    API_POOL_SIZE = int(os.environ.get('API_POOL_SIZE', '4'))  # keep-alive connections
+    API_RETRIES = int(os.environ.get('API_RETRIES', '2'))  # extra attempts for GETs
+    API_RETRY_BASE_SECONDS = float(os.environ.get('API_RETRY_BASE_SECONDS', '0.5'))
+    API_RETRY_MAX_SECONDS = float(os.environ.get('API_RETRY_MAX_SECONDS', '4'))
+    API_BREAKER_THRESHOLD = int(os.environ.get('API_BREAKER_THRESHOLD', '3'))  # consecutive failed calls
+    API_BREAKER_RESET_SECONDS = float(os.environ.get('API_BREAKER_RESET_SECONDS', '30'))
     
     # Hardware Configuration
     RELAY_GPIO_PIN = int(os.environ.get('RELAY_GPIO_PIN', '17'))
     UNLOCK_DURATION_SECONDS = int(os.environ.get('UNLOCK_DURATION_SECONDS', '5'))
+    REVERIFY_DELAY_SECONDS = int(os.environ.get('REVERIFY_DELAY_SECONDS', '5'))  # pause after relock
+    
+    # Multi-door mode: comma-separated room:camera:relay_pin tuples, e.g. "3:0:17,4:1:27".
+    # Empty serves one door, with the room chosen interactively.
+    DOORS = os.environ.get('ARIA_DOORS', '')
     
     # Face Recognition Configuration
     FACE_CONFIDENCE_THRESHOLD = float(os.environ.get('FACE_CONFIDENCE_THRESHOLD', '0.70'))
     FACE_DETECTION_COUNT_THRESHOLD = int(os.environ.get('FACE_DETECTION_COUNT_THRESHOLD', '3'))
     FACES_DB_FILE = Path(os.environ.get('FACES_DB_FILE', 'registered-faces-db.npz'))
     FACES_EMBEDDINGS_FILE = Path(os.environ.get('FACES_EMBEDDINGS_FILE', 'registered-faces-db-embeddings.npz'))
+    INFERENCE_BATCH_WINDOW_MS = int(os.environ.get('INFERENCE_BATCH_WINDOW_MS', '30'))  # wait for other doors' frames
+    
+    # Re-entry: after a full verification, the booked user gets back in on one confident match
+    REENTRY_TTL_SECONDS = int(os.environ.get('REENTRY_TTL_SECONDS', '1800'))  # 0 disables the fast path
+    REENTRY_CONFIDENCE_THRESHOLD = float(os.environ.get('REENTRY_CONFIDENCE_THRESHOLD', '0.85'))
+    
+    # Local Cache Configuration
+    LOCAL_CACHE_FILE = Path(os.environ.get('LOCAL_CACHE_FILE', 'aria_cache.db'))
+    
+    # Access Log Outbox Configuration
+    OUTBOX_FILE = Path(os.environ.get('OUTBOX_FILE', 'aria_outbox.db'))
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '50'))
+    OUTBOX_FLUSH_INTERVAL = int(os.environ.get('OUTBOX_FLUSH_INTERVAL', '5'))  # seconds
+    OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', '2'))
+    OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get('OUTBOX_RETRY_MAX_SECONDS', '300'))
     
     # Camera Configuration
     CAMERA_INDEX = int(os.environ.get('CAMERA_INDEX', '0'))
     CAMERA_FOURCC = os.environ.get('CAMERA_FOURCC', 'MJPG')
+    CAMERA_BUFFER_SIZE = int(os.environ.get('CAMERA_BUFFER_SIZE', '4'))  # frames in the capture ring buffer
+    CAMERA_KEEP_WARM = os.environ.get('CAMERA_KEEP_WARM', 'True').lower() == 'true'  # False: open only around bookings
+    PREWARM_SECONDS = int(os.environ.get('PREWARM_SECONDS', '60'))  # warm up this long before a booking starts
+    SHOW_PREVIEW = os.environ.get('SHOW_PREVIEW', 'True').lower() == 'true'
+    
+    # Motion Gate Configuration (skip detection while nothing moves)
+    MOTION_GATE_ENABLED = os.environ.get('MOTION_GATE_ENABLED', 'True').lower() == 'true'
+    MOTION_PIXEL_THRESHOLD = int(os.environ.get('MOTION_PIXEL_THRESHOLD', '25'))  # grayscale change, 0-255
+    MOTION_AREA_THRESHOLD = float(os.environ.get('MOTION_AREA_THRESHOLD', '0.02'))  # fraction of pixels
+    MOTION_HOLD_SECONDS = float(os.environ.get('MOTION_HOLD_SECONDS', '3'))
+    
+    # Frame-Rate Governor Configuration (backs off under heat, load or slow inference)
+    GOVERNOR_ENABLED = os.environ.get('GOVERNOR_ENABLED', 'True').lower() == 'true'
+    GOVERNOR_MAX_FPS = float(os.environ.get('GOVERNOR_MAX_FPS', '10'))  # processed frames per second per door
+    GOVERNOR_MIN_FPS = float(os.environ.get('GOVERNOR_MIN_FPS', '2'))
+    GOVERNOR_TEMP_HIGH = float(os.environ.get('GOVERNOR_TEMP_HIGH', '70'))  # degrees C
+    GOVERNOR_LOAD_HIGH = float(os.environ.get('GOVERNOR_LOAD_HIGH', '0.9'))  # load average per CPU
+    GOVERNOR_LATENCY_TARGET = float(os.environ.get('GOVERNOR_LATENCY_TARGET', '0.5'))  # seconds per frame
+    GOVERNOR_INTERVAL = float(os.environ.get('GOVERNOR_INTERVAL', '2'))  # seconds between readings
+    THERMAL_ZONE_FILE = Path(os.environ.get('THERMAL_ZONE_FILE', '/sys/class/thermal/thermal_zone0/temp'))
     
     # Polling Configuration
     BOOKING_CHECK_INTERVAL = int(os.environ.get('BOOKING_CHECK_INTERVAL', '30'))  # seconds
+    SYNC_LOOKAHEAD_DAYS = int(os.environ.get('SYNC_LOOKAHEAD_DAYS', '1'))  # days after today to sync
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'aria_client.log')
+    METRICS_LOG_INTERVAL = int(os.environ.get('METRICS_LOG_INTERVAL', '300'))  # seconds
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', '9105'))  # Prometheus /metrics endpoint, 0 to disable
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+    
+    @classmethod
+    def parse_doors(cls) -> List[Tuple[int, int, int]]:
+        """
+        Parse DOORS.
+        
+        Returns:
+            (room_id, camera_index, relay_pin) per door; empty if DOORS is unset
+        
+        Raises:
+            ValueError: If an entry is not room:camera:relay_pin
+        """
+        doors = []
+        for entry in filter(None, (part.strip() for part in cls.DOORS.split(','))):
+            fields = entry.split(':')
+            if len(fields) != 3:
+                raise ValueError(f"Invalid door entry '{entry}', expected room:camera:relay_pin")
+            room_id, camera_index, relay_pin = (int(field) for field in fields)
+            doors.append((room_id, camera_index, relay_pin))
+        return doors
     
     @classmethod
     def validate(cls):
@@ -47,5 +119,27 @@ class ClientConfig:
         if cls.FACE_CONFIDENCE_THRESHOLD < 0 or cls.FACE_CONFIDENCE_THRESHOLD > 1:
             errors.append("FACE_CONFIDENCE_THRESHOLD must be between 0 and 1")
         
+        if cls.REENTRY_CONFIDENCE_THRESHOLD < cls.FACE_CONFIDENCE_THRESHOLD or cls.REENTRY_CONFIDENCE_THRESHOLD > 1:
+            errors.append("REENTRY_CONFIDENCE_THRESHOLD must be between FACE_CONFIDENCE_THRESHOLD and 1")
+        
+        try:
+            doors = cls.parse_doors()
+        except ValueError as e:
+            errors.append(f"ARIA_DOORS: {str(e)}")
+            doors = []
+        for room_id, camera_index, relay_pin in doors:
+            if relay_pin < 1 or relay_pin > 40:
+                errors.append(f"ARIA_DOORS: relay pin for room {room_id} must be between 1 and 40")
+        if len({room_id for room_id, _, _ in doors}) != len(doors):
+            errors.append("ARIA_DOORS: each room may appear only once")
+        if len({relay_pin for _, _, relay_pin in doors}) != len(doors):
+            errors.append("ARIA_DOORS: each door needs its own relay pin")
+        
+        if cls.GOVERNOR_MIN_FPS <= 0 or cls.GOVERNOR_MIN_FPS > cls.GOVERNOR_MAX_FPS:
+            errors.append("GOVERNOR_MIN_FPS must be positive and no more than GOVERNOR_MAX_FPS")
+        
+        if cls.MOTION_AREA_THRESHOLD < 0 or cls.MOTION_AREA_THRESHOLD > 1:
+            errors.append("MOTION_AREA_THRESHOLD must be between 0 and 1")
+        
         return errors
 
@@ -3,16 +3,17 @@ Face recognition module for edge device.
 """
 import cv2
 import numpy as np
-from numpy import asarray, expand_dims, load
+from numpy import asarray, load
 from PIL import Image
 from sklearn.preprocessing import LabelEncoder, Normalizer
 from sklearn.linear_model import SGDClassifier
 from keras_facenet import FaceNet
 from pathlib import Path
 import logging
-from typing import Optional, Tuple
+from typing import Optional, List, Tuple
 
 from .config import ClientConfig
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -51,20 +52,22 @@ class FaceRecognizer:
             trainX, trainy, testX, testy = data['arr_0'], data['arr_1'], data['arr_2'], data['arr_3']
             
             # Normalize
-            self.normalizer = Normalizer(norm='l2')
-            trainX = self.normalizer.transform(trainX)
-            testX = self.normalizer.transform(testX)
+            normalizer = Normalizer(norm='l2')
+            trainX = normalizer.transform(trainX)
+            testX = normalizer.transform(testX)
             
             # Label encode
-            self.label_encoder = LabelEncoder()
-            self.label_encoder.fit(trainy)
-            trainy_encoded = self.label_encoder.transform(trainy)
-            testy_encoded = self.label_encoder.transform(testy)
+            label_encoder = LabelEncoder()
+            label_encoder.fit(trainy)
+            trainy_encoded = label_encoder.transform(trainy)
+            testy_encoded = label_encoder.transform(testy)
             
             # Train classifier
-            self.model = SGDClassifier(loss='log_loss')
-            self.model.fit(trainX, trainy_encoded)
+            model = SGDClassifier(loss='log_loss')
+            model.fit(trainX, trainy_encoded)
             
+            # Swap in together so a reload never mixes old and new gallery state
+            self.normalizer, self.label_encoder, self.model = normalizer, label_encoder, model
             self.loaded = True
             logger.info("Face recognition model loaded successfully")
             return True
@@ -73,19 +76,46 @@ class FaceRecognizer:
             logger.error(f"Error loading face recognition model: {str(e)}")
             return False
     
-    def get_face(self, image: np.ndarray) -> Tuple[Optional[np.ndarray], int, int, int, int]:
+    def has_identity(self, identity: str) -> bool:
+        """Check whether the loaded gallery has reference embeddings for a user."""
+        label_encoder = self.label_encoder
+        return label_encoder is not None and identity in label_encoder.classes_
+    
+    def warm_up(self):
+        """
+        Run detection and recognition once on blank input.
+        
+        The first TensorFlow call builds the graph and allocates buffers;
+        doing it ahead of time keeps that cost off the first real frame.
+        """
+        if not self.loaded:
+            return
+        
+        self.haar_cascade.detectMultiScale(np.zeros((480, 640, 3), dtype=np.uint8), 1.1, 4)
+        self.recognize_face(np.zeros((160, 160, 3), dtype=np.uint8))
+        logger.info("Face recognition model warmed up")
+    
+    def get_face(self, image: np.ndarray, scale: float = 1.0) -> Tuple[Optional[np.ndarray], int, int, int, int]:
         """
         Extract face from image.
         
+        Args:
+            image: BGR frame
+            scale: Run detection on the frame downscaled by this factor (cheaper);
+                the face is still cropped from the full-resolution frame
+        
         Returns:
             (face_array, x1, x2, y1, y2)
         """
-        faces = self.haar_cascade.detectMultiScale(image, 1.1, 4)
+        detect_image = image
+        if scale < 1.0:
+            detect_image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = self.haar_cascade.detectMultiScale(detect_image, 1.1, 4)
         
         if len(faces) == 0:
             return None, 0, 0, 0, 0
         
-        x1, y1, width, height = faces[0]
+        x1, y1, width, height = (int(v / scale) for v in faces[0])
         x1, y1 = abs(x1), abs(y1)
         x2, y2 = x1 + width, y1 + height
         
@@ -106,49 +136,65 @@ class FaceRecognizer:
         Returns:
             (identity, confidence) or (None, 0.0) if not recognized
         """
+        return self.recognize_faces([face_image], [expected_identity])[0]
+    
+    def recognize_faces(self, face_images: List[np.ndarray],
+                        expected_identities: List[Optional[str]]) -> List[Tuple[Optional[str], float]]:
+        """
+        Recognize several faces with one embedding and one classifier call.
+        
+        Args:
+            face_images: Face image arrays
+            expected_identities: Expected user ID for each face (None to skip verification)
+        
+        Returns:
+            (identity, confidence) per face; identity is None if not recognized
+        """
         if not self.loaded:
             logger.warning("Model not loaded. Call load_model() first.")
-            return None, 0.0
+            return [(None, 0.0)] * len(face_images)
+        
+        if not face_images:
+            return []
+        
+        # Snapshot the gallery so a background reload can't swap it mid-prediction
+        normalizer, model, label_encoder = self.normalizer, self.model, self.label_encoder
         
         try:
-            # Resize face
-            face = Image.fromarray(face_image)
-            face = face.resize((160, 160))
-            face = asarray(face)
-            
-            # Get embedding
-            face_embedding = expand_dims(face, axis=0)
-            signature = self.facenet.embeddings(face_embedding)
-            
-            # Normalize
-            samples = expand_dims(signature, axis=0)
-            nsamples, nx, ny = samples.shape
-            samples = samples.reshape((nsamples, nx * ny))
-            samples = self.normalizer.transform(samples)
+            # Resize faces
+            faces = np.stack([asarray(Image.fromarray(face).resize((160, 160))) for face in face_images])
             
-            # Predict
-            yhat_class = self.model.predict(samples)
-            yhat_prob = self.model.predict_proba(samples)
+            # Get embeddings (one row per face)
+            with metrics.timer('aria_stage_seconds', stage='facenet'):
+                signatures = self.facenet.embeddings(faces)
             
-            class_index = yhat_class[0]
-            class_probability = yhat_prob[0, class_index]
-            
-            predict_names = self.label_encoder.inverse_transform(yhat_class)
-            identity = predict_names[0]
-            
-            # Check if matches expected identity
-            if expected_identity and identity != expected_identity:
-                logger.debug(f"Identity mismatch: expected {expected_identity}, got {identity}")
-                return None, float(class_probability)
+            with metrics.timer('aria_stage_seconds', stage='classify'):
+                # Normalize
+                samples = normalizer.transform(signatures.reshape((len(face_images), -1)))
+                
+                # Predict
+                yhat_class = model.predict(samples)
+                yhat_prob = model.predict_proba(samples)
+                predict_names = label_encoder.inverse_transform(yhat_class)
             
-            # Check confidence threshold
-            if class_probability >= ClientConfig.FACE_CONFIDENCE_THRESHOLD:
-                return identity, float(class_probability)
-            else:
-                logger.debug(f"Confidence too low: {class_probability:.2f} < {ClientConfig.FACE_CONFIDENCE_THRESHOLD}")
-                return None, float(class_probability)
+            results = []
+            for i, expected_identity in enumerate(expected_identities):
+                class_probability = float(yhat_prob[i, yhat_class[i]])
+                identity = predict_names[i]
+                
+                # Check if matches expected identity
+                if expected_identity and identity != expected_identity:
+                    logger.debug(f"Identity mismatch: expected {expected_identity}, got {identity}")
+                    results.append((None, class_probability))
+                
+                # Check confidence threshold
+                elif class_probability >= ClientConfig.FACE_CONFIDENCE_THRESHOLD:
+                    results.append((identity, class_probability))
+                else:
+                    logger.debug(f"Confidence too low: {class_probability:.2f} < {ClientConfig.FACE_CONFIDENCE_THRESHOLD}")
+                    results.append((None, class_probability))
+            return results
                 
         except Exception as e:
             logger.error(f"Error recognizing face: {str(e)}")
-            return None, 0.0
-
+            return [(None, 0.0)] * len(face_images)
@@ -0,0 +1,136 @@
+"""
+Adaptive frame-rate governor for the recognition loop.
+"""
+import os
+import logging
+from pathlib import Path
+from typing import Optional
+
+from .config import ClientConfig
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (fraction of GOVERNOR_MAX_FPS, detection scale), from full speed to lightest.
+# FPS never drops below GOVERNOR_MIN_FPS.
+LEVELS = ((1.0, 1.0), (0.6, 0.75), (0.4, 0.5), (0.0, 0.5))
+
+# Consecutive calm readings needed before stepping back up a level
+RELAX_READINGS = 3
+
+
+class FrameGovernor:
+    """
+    Trades recognition rate for thermal and CPU headroom.
+    
+    Every update() reads SoC temperature, load average and the recent
+    per-frame latency. Under pressure it steps to a lighter level (lower FPS
+    cap, smaller detection scale) at once; it steps back only after several
+    calm readings, so the rate doesn't oscillate around a threshold.
+    """
+    
+    def __init__(self, max_fps: float = None, min_fps: float = None, temp_high: float = None,
+                 load_high: float = None, latency_target: float = None, thermal_file: Path = None):
+        """
+        Initialize governor.
+        
+        Args:
+            max_fps: Frames per second processed per door when unconstrained
+            min_fps: Floor for the processing rate
+            temp_high: SoC temperature (C) that counts as pressure
+            load_high: 1-minute load average per CPU that counts as pressure
+            latency_target: Per-frame inference latency (seconds) to stay under
+            thermal_file: sysfs temperature file (millidegrees C)
+        """
+        self.max_fps = max_fps or ClientConfig.GOVERNOR_MAX_FPS
+        self.min_fps = min_fps or ClientConfig.GOVERNOR_MIN_FPS
+        self.temp_high = temp_high or ClientConfig.GOVERNOR_TEMP_HIGH
+        self.load_high = load_high or ClientConfig.GOVERNOR_LOAD_HIGH
+        self.latency_target = latency_target or ClientConfig.GOVERNOR_LATENCY_TARGET
+        self.thermal_file = Path(thermal_file or ClientConfig.THERMAL_ZONE_FILE)
+        
+        self.level = 0
+        self.latency = 0.0  # moving average of per-frame inference latency
+        self._calm_readings = 0
+    
+    @property
+    def fps(self) -> float:
+        """Current processing rate cap per door."""
+        return max(self.min_fps, LEVELS[self.level][0] * self.max_fps)
+    
+    @property
+    def min_interval(self) -> float:
+        """Minimum seconds between processed frames of one door."""
+        return 1.0 / self.fps
+    
+    @property
+    def detection_scale(self) -> float:
+        """Current face detection downscale factor."""
+        return LEVELS[self.level][1]
+    
+    def record_latency(self, seconds: float):
+        """Record the inference latency of one frame."""
+        self.latency += 0.2 * (seconds - self.latency)
+    
+    def read_temperature(self) -> Optional[float]:
+        """Read SoC temperature in C, or None where sysfs thermal isn't available."""
+        try:
+            return int(self.thermal_file.read_text().strip()) / 1000
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def read_load() -> Optional[float]:
+        """Read the 1-minute load average per CPU, or None if unavailable."""
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return None
+    
+    def update(self) -> int:
+        """
+        Take a reading and adjust the level.
+        
+        Returns:
+            The new level (0 = full speed)
+        """
+        temperature = self.read_temperature()
+        load = self.read_load()
+        
+        pressure = (
+            (temperature is not None and temperature >= self.temp_high)
+            or (load is not None and load >= self.load_high)
+            or self.latency >= self.latency_target * 1.5
+        )
+        calm = (
+            (temperature is None or temperature < self.temp_high - 5)
+            and (load is None or load < self.load_high * 0.7)
+            and self.latency < self.latency_target
+        )
+        
+        previous = self.level
+        if pressure:
+            self._calm_readings = 0
+            self.level = min(self.level + 1, len(LEVELS) - 1)
+        elif calm and self.level > 0:
+            self._calm_readings += 1
+            if self._calm_readings >= RELAX_READINGS:
+                self._calm_readings = 0
+                self.level -= 1
+        else:
+            self._calm_readings = 0
+        
+        if self.level != previous:
+            logger.info(f"Governor level {previous} -> {self.level}: {self.fps:g} fps, "
+                        f"detection scale {self.detection_scale:g} (temperature: {temperature}, "
+                        f"load: {load if load is None else round(load, 2)}, latency: {self.latency:.3f}s)")
+        
+        metrics.set('aria_governor_level', self.level)
+        metrics.set('aria_governor_fps', self.fps)
+        metrics.set('aria_detection_scale', self.detection_scale)
+        metrics.set('aria_frame_latency_seconds', self.latency)
+        if temperature is not None:
+            metrics.set('aria_soc_temperature_celsius', temperature)
+        if load is not None:
+            metrics.set('aria_cpu_load_per_core', load)
+        return self.level
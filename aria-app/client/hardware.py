@@ -81,8 +81,9 @@ class DoorController:
         """Cleanup GPIO resources."""
         if GPIO_AVAILABLE:
             try:
-                GPIO.cleanup()
-                logger.info("GPIO cleaned up")
+                # Only release this relay's pin; other doors may share the process
+                GPIO.cleanup(self.gpio_pin)
+                logger.info(f"GPIO pin {self.gpio_pin} cleaned up")
             except Exception as e:
                 logger.error(f"Error cleaning up GPIO: {str(e)}")
 
@@ -0,0 +1,115 @@
+"""
+Batched face inference shared by all doors.
+"""
+import asyncio
+import time
+import logging
+from concurrent.futures import Executor
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+from .config import ClientConfig
+from .face_recognition import FaceRecognizer
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (face box (x1, x2, y1, y2) or None, identity, confidence)
+FrameResult = Tuple[Optional[Tuple[int, int, int, int]], Optional[str], float]
+
+
+class InferenceBatcher:
+    """
+    Collects frames from several doors and recognizes them together.
+    
+    Haar detection still runs per frame, but every detected face in a batch
+    goes through one FaceNet call and one classifier call. All inference
+    runs on a single executor thread, so the model is loaded once and never
+    used concurrently.
+    """
+    
+    def __init__(self, face_recognizer: FaceRecognizer, executor: Executor, max_batch: int = 1,
+                 batch_window: float = None):
+        """
+        Initialize the batcher.
+        
+        Args:
+            face_recognizer: Loaded FaceRecognizer shared by all doors
+            executor: Single-thread executor for inference
+            max_batch: Largest batch (normally the number of doors)
+            batch_window: Seconds to wait for other doors' frames before running a partial batch
+        """
+        self.face_recognizer = face_recognizer
+        self.executor = executor
+        self.max_batch = max_batch
+        self.batch_window = (ClientConfig.INFERENCE_BATCH_WINDOW_MS / 1000
+                             if batch_window is None else batch_window)
+        self.frame_cpu_seconds = 0.0  # moving average of detection + recognition CPU time per frame
+        self.detection_scale = 1.0  # set by the frame governor
+        self._queue: Optional[asyncio.Queue] = None
+    
+    async def submit(self, frame: np.ndarray, expected_identity: str) -> FrameResult:
+        """
+        Queue a frame for the next batch and wait for its result.
+        
+        The caller must not modify frame until this returns.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, expected_identity, future))
+        return await future
+    
+    async def run(self):
+        """Run batches until cancelled."""
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            frames = [frame for frame, _, _ in batch]
+            identities = [identity for _, identity, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._process_batch, frames, identities)
+            except Exception as e:
+                logger.error(f"Inference error: {str(e)}", exc_info=True)
+                results = [(None, None, 0.0)] * len(batch)
+            
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    def _process_batch(self, frames: List[np.ndarray], identities: List[str]) -> List[FrameResult]:
+        """Detect faces in each frame, then recognize them in one call (runs on the executor)."""
+        start = time.thread_time()
+        
+        results: List[FrameResult] = [(None, None, 0.0)] * len(frames)
+        faces, boxes, face_identities, positions = [], [], [], []
+        for i, frame in enumerate(frames):
+            with metrics.timer('aria_stage_seconds', stage='haar'):
+                face, x1, x2, y1, y2 = self.face_recognizer.get_face(frame, self.detection_scale)
+            if face is not None:
+                faces.append(face)
+                boxes.append((x1, x2, y1, y2))
+                face_identities.append(identities[i])
+                positions.append(i)
+        
+        recognized = self.face_recognizer.recognize_faces(faces, face_identities)
+        for i, box, (identity, confidence) in zip(positions, boxes, recognized):
+            results[i] = (box, identity, confidence)
+        
+        # Only the executor thread writes this
+        cpu_seconds = (time.thread_time() - start) / len(frames)
+        self.frame_cpu_seconds += 0.1 * (cpu_seconds - self.frame_cpu_seconds)
+        metrics.set('aria_frame_cpu_seconds', self.frame_cpu_seconds)
+        metrics.inc('aria_inference_batches_total')
+        return results
@@ -0,0 +1,191 @@
+"""
+Local SQLite cache for offline access control.
+"""
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List
+
+from .config import ClientConfig
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('Upcoming', 'Ongoing')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY,
+    room_id INTEGER NOT NULL,
+    stud_id TEXT,
+    staff_id TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_bookings_room_start ON bookings (room_id, start_time, end_time);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    user_type TEXT NOT NULL,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS rooms (
+    room_id INTEGER PRIMARY KEY,
+    room_name TEXT,
+    room_type TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_timestamp(value: str) -> str:
+    """Normalize an ISO timestamp so cached values compare correctly as strings."""
+    return datetime.fromisoformat(value).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class LocalCache:
+    """SQLite-backed cache of bookings, users, rooms and sync state."""
+    
+    def __init__(self, db_path: Path = None):
+        """
+        Open (and create if needed) the local cache database.
+        
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path or ClientConfig.LOCAL_CACHE_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Local cache opened at {self.db_path}")
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def get_state(self, key: str) -> Optional[str]:
+        """Get a sync state value."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row['value'] if row else None
+    
+    def set_state(self, key: str, value: Optional[str]):
+        """Set a sync state value."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+            )
+    
+    def apply_booking_changes(self, room_id: int, changes: Dict, cursor_key: str):
+        """
+        Apply a booking sync response in a single transaction.
+        
+        Args:
+            room_id: Room the changes belong to
+            changes: Response from APIClient.get_room_booking_changes
+            cursor_key: Sync state key to store the new cursor under
+        """
+        users = [
+            (u['UserID'], u['UserType'], u.get('Name'))
+            for u in changes.get('users', [])
+        ]
+        upserts = []
+        deletes = []
+        for booking in changes.get('bookings', []):
+            if booking.get('Status') in ACTIVE_STATUSES:
+                upserts.append((
+                    booking['BookingID'], room_id, booking.get('StudID'), booking.get('StaffID'),
+                    normalize_timestamp(booking['Start']), normalize_timestamp(booking['End']),
+                    booking['Status']
+                ))
+            else:
+                deletes.append((booking['BookingID'],))
+        active_ids = set(changes.get('active_ids', []))
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO users (user_id, user_type, name) VALUES (?, ?, ?)", users
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bookings "
+                "(booking_id, room_id, stud_id, staff_id, start_time, end_time, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", upserts
+            )
+            self._conn.executemany("DELETE FROM bookings WHERE booking_id = ?", deletes)
+            
+            # Drop bookings deleted on the server or outside the window
+            cached_ids = [
+                row['booking_id'] for row in self._conn.execute(
+                    "SELECT booking_id FROM bookings WHERE room_id = ?", (room_id,)
+                )
+            ]
+            self._conn.executemany(
+                "DELETE FROM bookings WHERE booking_id = ?",
+                [(booking_id,) for booking_id in cached_ids if booking_id not in active_ids]
+            )
+            
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (cursor_key, changes.get('cursor'))
+            )
+    
+    def get_room_bookings(self, room_id: int) -> List[Dict]:
+        """Get all cached bookings for a room, ordered by start time."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM bookings WHERE room_id = ? ORDER BY start_time", (room_id,)
+            ).fetchall()
+        return [self._booking_from_row(row) for row in rows]
+    
+    def get_users(self) -> List[Dict]:
+        """Get all cached users."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM users").fetchall()
+        return [
+            {'UserID': row['user_id'], 'UserType': row['user_type'], 'Name': row['name']}
+            for row in rows
+        ]
+    
+    def save_rooms(self, rooms: List[Dict]):
+        """Replace the cached room list."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rooms")
+            self._conn.executemany(
+                "INSERT INTO rooms (room_id, room_name, room_type) VALUES (?, ?, ?)",
+                [(r.get('RoomID'), r.get('RoomName'), r.get('RoomType')) for r in rooms]
+            )
+    
+    def get_rooms(self) -> List[Dict]:
+        """Get the cached room list (API field names)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM rooms ORDER BY room_id").fetchall()
+        return [
+            {'RoomID': row['room_id'], 'RoomName': row['room_name'], 'RoomType': row['room_type']}
+            for row in rows
+        ]
+    
+    @staticmethod
+    def _booking_from_row(row: sqlite3.Row) -> Dict:
+        """Convert a bookings row to the API booking format."""
+        return {
+            'BookingID': row['booking_id'],
+            'RoomID': row['room_id'],
+            'StudID': row['stud_id'],
+            'StaffID': row['staff_id'],
+            'Start': row['start_time'],
+            'End': row['end_time'],
+            'Status': row['status']
+        }
@@ -0,0 +1,227 @@
+"""
+In-process metrics for the edge device client, exported in Prometheus text format.
+"""
+import threading
+import time
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List, Tuple
+
+from .config import ClientConfig
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from camera reads up to slow API calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'aria_stage_seconds': 'Latency of each access pipeline stage',
+    'aria_api_request_seconds': 'Server response time of API calls',
+    'aria_api_requests_total': 'API calls by endpoint and status code',
+    'aria_api_errors_total': 'API attempts that failed to connect, timed out or got a 5xx',
+    'aria_api_retries_total': 'API attempts retried after a failure',
+    'aria_api_short_circuits_total': 'API calls skipped while the circuit breaker was open',
+    'aria_api_circuit_state': 'API circuit breaker state (0 closed, 1 open, 2 half-open)',
+    'aria_frames_processed_total': 'Frames run through face detection',
+    'aria_frames_skipped_total': 'Frames skipped before face detection',
+    'aria_cpu_seconds_saved_total': 'Estimated detection CPU time saved by skipping frames',
+    'aria_frame_cpu_seconds': 'Moving average of detection and recognition CPU time per frame',
+    'aria_inference_batches_total': 'Batched inference runs',
+    'aria_face_checks_total': 'Detected faces checked against the booked user',
+    'aria_unlocks_total': 'Door unlocks after successful verification',
+    'aria_denials_total': 'Bookings that ended with unverified faces and no unlock',
+    'aria_reentries_total': 'Unlocks on the single-match re-entry path',
+    'aria_governor_level': 'Frame governor level (0 = full speed)',
+    'aria_governor_fps': 'Processed frames per second cap per door',
+    'aria_detection_scale': 'Face detection downscale factor',
+    'aria_frame_latency_seconds': 'Moving average of per-frame inference latency',
+    'aria_soc_temperature_celsius': 'SoC temperature',
+    'aria_cpu_load_per_core': '1-minute load average per CPU',
+}
+
+# (metric name, sorted label pairs)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Histogram:
+    """Cumulative-bucket histogram."""
+    
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * bucket_count
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, buckets: Tuple[float, ...], value: float):
+        index = bisect_left(buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms with optional labels."""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = {}
+        self._gauges: Dict[MetricKey, float] = {}
+        self._histograms: Dict[MetricKey, _Histogram] = {}
+    
+    @staticmethod
+    def _key(name: str, labels: Dict) -> MetricKey:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+    
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increment a counter."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+    
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+    
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram sample."""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            histogram.observe(self.buckets, value)
+    
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of a block in a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    def get(self, name: str, **labels) -> float:
+        """Get a counter or gauge value (0 if never recorded)."""
+        key = self._key(name, labels)
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0.0))
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Get all counters and gauges, plus histogram counts and sums."""
+        with self._lock:
+            values = {self._format(key): value for key, value in {**self._counters, **self._gauges}.items()}
+            for (name, labels), histogram in self._histograms.items():
+                values[self._format((name + '_count', labels))] = histogram.count
+                values[self._format((name + '_sum', labels))] = histogram.sum
+            return values
+    
+    def log_summary(self):
+        """Log all current values."""
+        values = self.snapshot()
+        if values:
+            logger.info("Metrics: " + ", ".join(f"{name}={value:g}" for name, value in sorted(values.items())))
+    
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+        
+        lines: List[str] = []
+        described = set()
+        
+        def describe(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+        
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for key, value in items:
+                describe(key[0], kind)
+                lines.append(f"{self._format(key)} {value:g}")
+        
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self._format((name + '_bucket', labels + (('le', f'{bound:g}'),)))} {cumulative}")
+            lines.append(f"{self._format((name + '_bucket', labels + (('le', '+Inf'),)))} {count}")
+            lines.append(f"{self._format((name + '_sum', labels))} {total:g}")
+            lines.append(f"{self._format((name + '_count', labels))} {count}")
+        
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _format(key: MetricKey) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        pairs = ",".join(
+            '{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels
+        )
+        return f"{name}{{{pairs}}}"
+
+
+# Process-wide registry
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry at /metrics."""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the client log
+        pass
+
+
+def start_metrics_server(port: int = None, host: str = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics on a background thread.
+    
+    Args:
+        port: TCP port (0 disables the endpoint)
+        host: Address to bind
+    
+    Returns:
+        The running server, or None if disabled or the port is unavailable
+    """
+    port = ClientConfig.METRICS_PORT if port is None else port
+    host = host or ClientConfig.METRICS_HOST
+    if not port:
+        return None
+    
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on {host}:{port}: {str(e)}")
+        return None
+    
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
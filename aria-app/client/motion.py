@@ -0,0 +1,83 @@
+"""
+Cheap motion gate ahead of face detection.
+"""
+import logging
+
+import cv2
+import numpy as np
+
+from .config import ClientConfig
+
+logger = logging.getLogger(__name__)
+
+# Thumbnail compared between frames (width, height)
+THUMBNAIL_SIZE = (32, 24)
+
+
+class MotionGate:
+    """
+    Decides whether a frame is worth running detection on.
+    
+    Each frame is shrunk to a small grayscale thumbnail and diffed against
+    the previous one. A frame passes when enough thumbnail pixels changed,
+    and the gate then stays open for a hold period so a person who stops
+    moving in front of the camera is still verified. Thumbnail buffers are
+    allocated once and reused.
+    """
+    
+    def __init__(self, pixel_threshold: int = None, area_threshold: float = None,
+                 hold_seconds: float = None):
+        """
+        Initialize motion gate.
+        
+        Args:
+            pixel_threshold: Per-pixel grayscale change (0-255) that counts as motion
+            area_threshold: Fraction of thumbnail pixels that must change (0-1)
+            hold_seconds: How long the gate stays open after motion
+        """
+        self.pixel_threshold = ClientConfig.MOTION_PIXEL_THRESHOLD if pixel_threshold is None else pixel_threshold
+        self.area_threshold = ClientConfig.MOTION_AREA_THRESHOLD if area_threshold is None else area_threshold
+        self.hold_seconds = ClientConfig.MOTION_HOLD_SECONDS if hold_seconds is None else hold_seconds
+        
+        width, height = THUMBNAIL_SIZE
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._previous = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self._min_changed = max(1, int(self.area_threshold * width * height))
+        self._has_previous = False
+        self._open_until = 0.0
+    
+    def reset(self):
+        """Forget the previous frame and close the gate."""
+        self._has_previous = False
+        self._open_until = 0.0
+    
+    def check(self, frame: np.ndarray, now: float) -> bool:
+        """
+        Check a frame for motion.
+        
+        Args:
+            frame: BGR frame
+            now: Monotonic time of the frame
+        
+        Returns:
+            True if the frame should go through detection
+        """
+        cv2.resize(frame, THUMBNAIL_SIZE, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        
+        if not self._has_previous:
+            self._has_previous = True
+            self._previous, self._gray = self._gray, self._previous
+            self._open_until = now + self.hold_seconds
+            return True
+        
+        cv2.absdiff(self._gray, self._previous, dst=self._diff)
+        changed = np.count_nonzero(self._diff > self.pixel_threshold)
+        self._previous, self._gray = self._gray, self._previous
+        
+        if changed >= self._min_changed:
+            self._open_until = now + self.hold_seconds
+            return True
+        return now < self._open_until
@@ -0,0 +1,157 @@
+"""
+Durable outbox for access log events.
+"""
+import json
+import random
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from .config import ClientConfig
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class AccessLogOutbox:
+    """
+    Persistent queue of access events flushed to the server in batches.
+    
+    enqueue() only writes to local SQLite, so unlocking never waits on the
+    network; flush() drains the queue with jittered exponential backoff.
+    """
+    
+    def __init__(self, api_client, db_path: Path = None):
+        """
+        Open (and create if needed) the outbox database.
+        
+        Args:
+            api_client: APIClient instance
+            db_path: Path to the SQLite file
+        """
+        self.api_client = api_client
+        self.db_path = db_path or ClientConfig.OUTBOX_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._failures = 0
+        self._retry_at = 0.0
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def enqueue(self, room_id: int, stud_id: str = None, staff_id: str = None,
+                status: int = 1, timestamp: str = None):
+        """
+        Queue a room access event.
+        
+        Args:
+            room_id: Room ID
+            stud_id: Student ID (if student)
+            staff_id: Staff ID (if staff)
+            status: Access status (0=denied, 1=granted)
+            timestamp: Timestamp (ISO format), defaults to now
+        """
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        payload = json.dumps({
+            'RoomID': room_id,
+            'StudID': stud_id,
+            'StaffID': staff_id,
+            'Status': status,
+            'Timestamp': timestamp
+        })
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outbox (payload, created_at) VALUES (?, ?)", (payload, time.time())
+            )
+    
+    def pending_count(self) -> int:
+        """Get the number of queued events."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    
+    def flush(self) -> int:
+        """
+        Send queued events to the server.
+        
+        Returns:
+            Number of events delivered
+        """
+        sent = 0
+        while time.monotonic() >= self._retry_at:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM outbox ORDER BY id LIMIT ?",
+                    (ClientConfig.OUTBOX_BATCH_SIZE,)
+                ).fetchall()
+            if not rows:
+                break
+            
+            result = self.api_client.log_access_batch([json.loads(payload) for _, payload in rows])
+            if result is None:
+                self._schedule_retry()
+                break
+            
+            self._failures = 0
+            if result:
+                self._delete([row_id for row_id, _ in rows])
+                sent += len(rows)
+            else:
+                sent += self._send_individually(rows)
+        
+        if sent:
+            logger.info(f"Outbox flushed {sent} access events")
+        return sent
+    
+    def _send_individually(self, rows: List) -> int:
+        """
+        Resend a rejected batch one event at a time to isolate invalid events.
+        
+        Invalid events are dropped so they can't block the queue forever.
+        """
+        sent = 0
+        for row_id, payload in rows:
+            result = self.api_client.log_access_batch([json.loads(payload)])
+            if result is None:
+                self._schedule_retry()
+                break
+            if result:
+                sent += 1
+            else:
+                logger.error(f"Dropping access event rejected by server: {payload}")
+            self._delete([row_id])
+        return sent
+    
+    def _delete(self, row_ids: List[int]):
+        """Remove delivered events."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in row_ids])
+    
+    def _schedule_retry(self):
+        """Back off exponentially, with jitter so doors don't retry in lockstep."""
+        self._failures += 1
+        delay = min(
+            ClientConfig.OUTBOX_RETRY_MAX_SECONDS,
+            ClientConfig.OUTBOX_RETRY_BASE_SECONDS * (2 ** (self._failures - 1))
+        )
+        delay *= random.uniform(0.5, 1.0)
+        self._retry_at = time.monotonic() + delay
+        logger.warning(f"Outbox flush failed; retrying in {delay:.1f}s "
+                       f"({self.pending_count()} events pending)")
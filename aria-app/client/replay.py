@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay harness for the edge device client.
+
+Runs the real access pipeline (API client, local cache, room monitor,
+runtime, face recognition) with recorded video or image sequences in place
+of the camera, a local stand-in for the ARIA /api endpoints, and the
+simulated relay. Each attempt reports time-to-unlock, whether the unlock
+was correct and the CPU time it cost, so recognizer changes can be
+benchmarked on any Linux box.
+
+Scenario file (JSON, paths relative to the file):
+
+    {
+        "room_id": 3,
+        "embeddings": "registered-faces-db-embeddings.npz",
+        "users": [{"UserID": "S1001", "UserType": "student", "Name": "Alice"}],
+        "attempts": [
+            {"source": "clips/alice.mp4", "booked_user": "S1001", "expect_unlock": true},
+            {"source": "frames/bob", "booked_user": "S1001", "expect_unlock": false}
+        ]
+    }
+
+A source is a video file or a directory of images (played in name order).
+
+Usage:
+    python -m client.replay scenario.json [--fps 15] [--timeout 20] [--json report.json]
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Dict, List
+
+import cv2
+import numpy as np
+
+from .config import ClientConfig
+from .api_client import APIClient
+from .camera import CameraService
+from .face_recognition import FaceRecognizer
+from .hardware import DoorController
+from .local_cache import LocalCache
+from .outbox import AccessLogOutbox
+from .room_monitor import RoomMonitor
+from .runtime import AccessRuntime
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+class ReplayCapture:
+    """
+    cv2.VideoCapture stand-in that plays a video file or image directory.
+    
+    Frames are paced at fps to mimic a live camera (0 plays as fast as
+    possible). read() returns False once the source is exhausted.
+    """
+    
+    def __init__(self, source: Path, fps: float = 15):
+        """
+        Open a recorded source.
+        
+        Args:
+            source: Video file or directory of images
+            fps: Playback rate
+        """
+        self.source = Path(source)
+        self.fps = fps
+        self.started_at: Optional[float] = None
+        self.finished = False
+        self.frames_read = 0
+        
+        if self.source.is_dir():
+            self._images = sorted(p for p in self.source.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+            self._video = None
+        else:
+            self._images = None
+            self._video = cv2.VideoCapture(str(self.source))
+            if not self._video.isOpened():
+                raise ValueError(f"Cannot open replay source: {self.source}")
+    
+    def isOpened(self) -> bool:
+        return not self.finished
+    
+    def set(self, prop_id, value) -> bool:
+        # Capture properties (FOURCC etc.) don't apply to recordings
+        return True
+    
+    def read(self, image: np.ndarray = None):
+        """Return the next frame, written into image when its shape matches."""
+        if self.finished:
+            return False, None
+        
+        now = time.monotonic()
+        if self.started_at is None:
+            self.started_at = now
+        elif self.fps:
+            # Wait for this frame's slot on the playback clock
+            delay = self.started_at + self.frames_read / self.fps - now
+            if delay > 0:
+                time.sleep(delay)
+        
+        frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False, None
+        
+        self.frames_read += 1
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+    
+    def _next_frame(self) -> Optional[np.ndarray]:
+        if self._video is not None:
+            ret, frame = self._video.read()
+            return frame if ret else None
+        
+        while self.frames_read < len(self._images):
+            frame = cv2.imread(str(self._images[self.frames_read]))
+            if frame is not None:
+                return frame
+            logger.warning(f"Skipping unreadable image: {self._images[self.frames_read]}")
+            del self._images[self.frames_read]
+        return None
+    
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+        self.finished = True
+
+
+class FixtureServer:
+    """
+    Local stand-in for the ARIA /api endpoints the client uses.
+    
+    Serves the room list, the monitored room's bookings and users, the face
+    gallery version and embeddings, and records posted access events.
+    """
+    
+    def __init__(self, room_id: int, users: List[Dict], embeddings_path: Path = None):
+        self.room_id = room_id
+        self.users = {user['UserID']: user for user in users}
+        self.embeddings_path = embeddings_path
+        self.bookings: List[Dict] = []
+        self.access_events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+    
+    def start(self):
+        """Serve on an ephemeral localhost port."""
+        fixtures = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixtures._handle(self, 'GET')
+            
+            def do_POST(self):
+                fixtures._handle(self, 'POST')
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fixtures', daemon=True).start()
+        logger.info(f"Fixture API at {self.base_url}")
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+    
+    def book(self, booking_id: int, user_id: str, start: datetime, end: datetime):
+        """Replace the room's bookings with one booking for user_id."""
+        user = self.users.get(user_id, {})
+        is_staff = user.get('UserType') == 'staff'
+        with self._lock:
+            self.bookings = [{
+                'BookingID': booking_id,
+                'RoomID': self.room_id,
+                'StudID': None if is_staff else user_id,
+                'StaffID': user_id if is_staff else None,
+                'Start': start.strftime("%Y-%m-%dT%H:%M:%S"),
+                'End': end.strftime("%Y-%m-%dT%H:%M:%S"),
+                'Status': 'Upcoming'
+            }]
+    
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        path = handler.path.split('?')[0]
+        
+        if method == 'GET' and path == '/api/roomlist':
+            self._send_json(handler, [{
+                'RoomID': self.room_id, 'RoomName': f'Replay Room {self.room_id}', 'RoomType': 'Normal Room'
+            }])
+        elif method == 'GET' and re.fullmatch(rf'/api/rooms/{self.room_id}/bookings', path):
+            # Always a full window: the client prunes with active_ids
+            with self._lock:
+                bookings = list(self.bookings)
+            user_ids = {b['StudID'] or b['StaffID'] for b in bookings}
+            self._send_json(handler, {
+                'bookings': bookings,
+                'active_ids': [b['BookingID'] for b in bookings],
+                'users': [self.users[u] for u in user_ids if u in self.users],
+                'cursor': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+            })
+        elif method == 'GET' and path == '/api/facesversion':
+            self._send_json(handler, {'version': 'replay'})
+        elif method == 'GET' and path == '/api/facesembeds' and self.embeddings_path:
+            body = self.embeddings_path.read_bytes()
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/octet-stream')
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        elif method == 'POST' and path in ('/api/accesslogs', '/api/accesslogs/batch'):
+            length = int(handler.headers.get('Content-Length', 0))
+            payload = json.loads(handler.rfile.read(length) or b'{}')
+            events = payload.get('events', []) if path.endswith('/batch') else [payload]
+            with self._lock:
+                self.access_events.extend(events)
+            self._send_json(handler, {'created': len(events)}, status=201)
+        else:
+            handler.send_error(404)
+    
+    @staticmethod
+    def _send_json(handler: BaseHTTPRequestHandler, data, status: int = 200):
+        body = json.dumps(data).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class RecordingDoorController(DoorController):
+    """Simulated relay that records when it unlocked."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unlocked_at: Optional[float] = None
+    
+    def unlock(self) -> bool:
+        if self.unlocked_at is None:
+            self.unlocked_at = time.monotonic()
+        return super().unlock()
+
+
+def run_attempt(attempt: Dict, index: int, scenario_dir: Path, fixtures: FixtureServer,
+                api_client: APIClient, face_recognizer: FaceRecognizer, work_dir: Path,
+                fps: float, timeout: float) -> Dict:
+    """
+    Replay one recorded access attempt through the full pipeline.
+    
+    Returns:
+        Result dict (source, unlocked, time_to_unlock, cpu_seconds, frames, correct)
+    """
+    source = scenario_dir / attempt['source']
+    expect_unlock = attempt.get('expect_unlock', True)
+    now = datetime.now()
+    fixtures.book(index, attempt['booked_user'], now - timedelta(minutes=1), now + timedelta(hours=1))
+    
+    capture = ReplayCapture(source, fps)
+    door_controller = RecordingDoorController(unlock_duration=1)
+    cache = LocalCache(work_dir / f'cache-{index}.db')
+    outbox = AccessLogOutbox(api_client, work_dir / f'outbox-{index}.db')
+    monitor = RoomMonitor(api_client, fixtures.room_id, cache)
+    # Synced up front so the first booking check already sees the booking
+    monitor.sync()
+    
+    runtime = AccessRuntime(face_recognizer, outbox)
+    runtime.add_door(monitor, door_controller, CameraService(0, capture_factory=lambda _: capture))
+    
+    async def until_done():
+        task = asyncio.ensure_future(runtime.run())
+        deadline = time.monotonic() + timeout
+        while (door_controller.unlocked_at is None and not capture.finished
+               and time.monotonic() < deadline and not task.done()):
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    cpu_start = time.process_time()
+    asyncio.run(until_done())
+    cpu_seconds = time.process_time() - cpu_start
+    
+    cache.close()
+    outbox.close()
+    
+    unlocked = door_controller.unlocked_at is not None
+    time_to_unlock = None
+    if unlocked and capture.started_at is not None:
+        time_to_unlock = door_controller.unlocked_at - capture.started_at
+    
+    return {
+        'source': attempt['source'],
+        'booked_user': attempt['booked_user'],
+        'expect_unlock': expect_unlock,
+        'unlocked': unlocked,
+        'correct': unlocked == expect_unlock,
+        'time_to_unlock': time_to_unlock,
+        'cpu_seconds': cpu_seconds,
+        'frames': capture.frames_read
+    }
+
+
+def summarize(results: List[Dict]) -> Dict:
+    """Aggregate attempt results."""
+    unlock_times = sorted(r['time_to_unlock'] for r in results if r['expect_unlock'] and r['unlocked'])
+    return {
+        'attempts': len(results),
+        'false_accepts': sum(1 for r in results if r['unlocked'] and not r['expect_unlock']),
+        'false_rejects': sum(1 for r in results if not r['unlocked'] and r['expect_unlock']),
+        'median_time_to_unlock': unlock_times[len(unlock_times) // 2] if unlock_times else None,
+        'max_time_to_unlock': unlock_times[-1] if unlock_times else None,
+        'mean_cpu_seconds': sum(r['cpu_seconds'] for r in results) / len(results) if results else 0.0
+    }
+
+
+def print_report(results: List[Dict], summary: Dict):
+    """Print a results table."""
+    print(f"\n{'Source':<32} {'User':<12} {'Expect':<7} {'Result':<9} {'Unlock s':>9} {'CPU s':>7} {'Frames':>7}")
+    for r in results:
+        outcome = 'unlock' if r['unlocked'] else 'locked'
+        if not r['correct']:
+            outcome += ' !'
+        unlock = f"{r['time_to_unlock']:.2f}" if r['time_to_unlock'] is not None else '-'
+        print(f"{r['source']:<32} {r['booked_user']:<12} {'unlock' if r['expect_unlock'] else 'locked':<7} "
+              f"{outcome:<9} {unlock:>9} {r['cpu_seconds']:>7.2f} {r['frames']:>7}")
+    
+    print(f"\nAttempts: {summary['attempts']}  False accepts: {summary['false_accepts']}  "
+          f"False rejects: {summary['false_rejects']}")
+    if summary['median_time_to_unlock'] is not None:
+        print(f"Time to unlock: median {summary['median_time_to_unlock']:.2f}s, "
+              f"max {summary['max_time_to_unlock']:.2f}s")
+    print(f"CPU per attempt: {summary['mean_cpu_seconds']:.2f}s")
+
+
+def main(argv: List[str] = None) -> int:
+    """Run a replay scenario."""
+    parser = argparse.ArgumentParser(description="Replay recorded access attempts through the ARIA client")
+    parser.add_argument('scenario', type=Path, help="Scenario JSON file")
+    parser.add_argument('--fps', type=float, default=15, help="Playback rate (0 = as fast as possible)")
+    parser.add_argument('--timeout', type=float, default=20, help="Seconds to wait for an unlock per attempt")
+    parser.add_argument('--json', type=Path, help="Also write results to this file")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=getattr(logging, ClientConfig.LOG_LEVEL),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    scenario = json.loads(args.scenario.read_text())
+    scenario_dir = args.scenario.resolve().parent
+    
+    # No preview windows or relock pauses while benchmarking
+    ClientConfig.SHOW_PREVIEW = False
+    ClientConfig.REVERIFY_DELAY_SECONDS = 0
+    
+    embeddings_path = scenario_dir / scenario['embeddings']
+    fixtures = FixtureServer(scenario['room_id'], scenario.get('users', []), embeddings_path)
+    fixtures.start()
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix='aria-replay-') as work:
+            work_dir = Path(work)
+            api_client = APIClient(base_url=fixtures.base_url, timeout=5)
+            
+            # Fetch the gallery through the client like a real device would
+            gallery_path = work_dir / 'embeddings.npz'
+            face_recognizer = FaceRecognizer()
+            if not api_client.get_face_embeddings(str(gallery_path)) or \
+                    not face_recognizer.load_model(embeddings_path=gallery_path):
+                logger.error("Failed to load face gallery for replay")
+                return 1
+            face_recognizer.warm_up()
+            
+            results = [
+                run_attempt(attempt, index, scenario_dir, fixtures, api_client, face_recognizer,
+                            work_dir, args.fps, args.timeout)
+                for index, attempt in enumerate(scenario['attempts'], start=1)
+            ]
+    finally:
+        fixtures.stop()
+    
+    summary = summarize(results)
+    print_report(results, summary)
+    if args.json:
+        args.json.write_text(json.dumps({'results': results, 'summary': summary}, indent=2))
+    
+    return 0 if summary['false_accepts'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
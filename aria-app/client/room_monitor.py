@@ -2,8 +2,12 @@
 Room booking monitor and access control logic.
 """
 import logging
-from datetime import datetime
-from typing import Optional, Dict, List
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Tuple
+
+from .config import ClientConfig
+from .local_cache import LocalCache, ACTIVE_STATUSES, normalize_timestamp
+from .booking_timeline import BookingTimeline
 
 logger = logging.getLogger(__name__)
 
@@ -11,53 +15,123 @@ logger = logging.getLogger(__name__)
 class RoomMonitor:
     """Monitor room bookings and manage access."""
     
-    def __init__(self, api_client, room_id: int):
+    def __init__(self, api_client, room_id: int, cache: LocalCache):
         """
         Initialize room monitor.
         
         Args:
             api_client: APIClient instance
             room_id: Room ID to monitor
+            cache: LocalCache holding bookings and users between syncs and restarts
         """
         self.api_client = api_client
         self.room_id = room_id
+        self.cache = cache
         self.current_booking: Optional[Dict] = None
+        
+        # In-memory indexes over the cache, updated with each sync delta
+        self.timeline = BookingTimeline()
+        self.timeline.load(cache.get_room_bookings(room_id))
+        self.users: Dict[str, Dict] = {user['UserID']: user for user in cache.get_users()}
+    
+    @property
+    def _cursor_key(self) -> str:
+        return f'cursor:{self.room_id}'
+    
+    @property
+    def _window_key(self) -> str:
+        return f'window:{self.room_id}'
+    
+    @staticmethod
+    def sync_window(now: datetime = None) -> Tuple[datetime, datetime]:
+        """
+        Get the booking window to keep in sync.
+        
+        The window is anchored to calendar days so it stays fixed between syncs;
+        a moving window would let bookings slide in without an UpdatedAt change.
+        """
+        now = now or datetime.now()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=1 + ClientConfig.SYNC_LOOKAHEAD_DAYS)
+        return start, end
+    
+    def sync(self) -> bool:
+        """
+        Fetch booking changes for this room and apply them to the local cache.
+        
+        Returns:
+            True if the server answered, False if the cached data was kept as-is
+        """
+        window = self.sync_window()
+        window_id = window[0].isoformat()
+        cursor = self.cache.get_state(self._cursor_key)
+        if self.cache.get_state(self._window_key) != window_id:
+            # New day: refetch the whole window; stale rows are pruned once it arrives
+            cursor = None
+        
+        changes = self.api_client.get_room_booking_changes(
+            self.room_id, window[0], window[1], cursor
+        )
+        if changes is None:
+            logger.warning("Booking sync failed; serving cached bookings")
+            return False
+        
+        self.cache.apply_booking_changes(self.room_id, changes, self._cursor_key)
+        self.cache.set_state(self._window_key, window_id)
+        self._apply_to_indexes(changes)
+        
+        logger.info(f"Bookings synced for room {self.room_id}: "
+                    f"{len(changes.get('bookings', []))} changed")
+        return True
+    
+    def _apply_to_indexes(self, changes: Dict):
+        """Apply a sync response to the in-memory timeline and user index."""
+        for user in changes.get('users', []):
+            self.users[user['UserID']] = user
+        
+        for booking in changes.get('bookings', []):
+            if booking.get('Status') in ACTIVE_STATUSES:
+                self.timeline.upsert(dict(
+                    booking,
+                    RoomID=self.room_id,
+                    Start=normalize_timestamp(booking['Start']),
+                    End=normalize_timestamp(booking['End'])
+                ))
+            else:
+                self.timeline.remove(booking['BookingID'])
+        
+        self.timeline.retain(self.room_id, changes.get('active_ids', []))
     
-    def get_current_booking(self, bookings: List[Dict]) -> Optional[Dict]:
+    def get_current_booking(self, now: datetime = None) -> Optional[Dict]:
         """
         Get current active booking for the room.
         
         Args:
-            bookings: List of all bookings
+            now: Time to check (defaults to now)
             
         Returns:
             Current booking dict or None
         """
-        now = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        return self.timeline.current(self.room_id, now or datetime.now())
+    
+    def get_next_booking(self, now: datetime = None) -> Optional[Dict]:
+        """
+        Get the next booking for the room that has not started yet.
         
-        for booking in bookings:
-            if booking.get('RoomID') != self.room_id:
-                continue
-            
-            start = booking.get('Start')
-            end = booking.get('End')
-            
-            if start and end and start <= now < end:
-                # Check if booking is active
-                status = booking.get('RBookStatus', '')
-                if status in ['Upcoming', 'Ongoing']:
-                    return booking
+        Args:
+            now: Time to check (defaults to now)
         
-        return None
+        Returns:
+            Upcoming booking dict or None
+        """
+        return self.timeline.next_upcoming(self.room_id, now or datetime.now())
     
-    def get_expected_user(self, booking: Dict, students: List[Dict], staff: List[Dict]) -> Optional[str]:
+    def get_expected_user(self, booking: Dict) -> Optional[str]:
         """
         Get expected user ID from booking.
         
         Args:
             booking: Booking dictionary
-            students: List of students
-            staff: List of staff
             
         Returns:
             User ID (StudID or StaffID) or None
@@ -65,38 +139,11 @@ class RoomMonitor:
         stud_id = booking.get('StudID')
         staff_id = booking.get('StaffID')
         
-        if stud_id:
-            # Verify student exists
-            for student in students:
-                if student.get('StudID') == stud_id:
-                    return stud_id
+        # Verify the user was synced with the booking
+        if stud_id and stud_id in self.users:
+            return stud_id
         
-        if staff_id:
-            # Verify staff exists
-            for staff_member in staff:
-                if staff_member.get('StaffID') == staff_id:
-                    return staff_id
+        if staff_id and staff_id in self.users:
+            return staff_id
         
         return None
-    
-    def refresh_data(self) -> Dict:
-        """
-        Refresh data from API.
-        
-        Returns:
-            Dictionary with students, staff, bookings, rooms
-        """
-        logger.info("Refreshing data from API...")
-        
-        data = {
-            'students': self.api_client.get_students(),
-            'staff': self.api_client.get_staff(),
-            'bookings': self.api_client.get_room_bookings(),
-            'rooms': self.api_client.get_rooms()
-        }
-        
-        logger.info(f"Data refreshed: {len(data['students'])} students, "
-                   f"{len(data['staff'])} staff, {len(data['bookings'])} bookings")
-        
-        return data
-
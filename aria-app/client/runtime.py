@@ -0,0 +1,462 @@
+"""
+Asyncio runtime for the edge device.
+
+Each door (room, camera, relay) runs its own booking, verification and
+relay state machine; booking sync, outbox flushing and batched face
+inference are shared. Everything runs as independent tasks on one event
+loop, and cameras capture on their own threads. Blocking work (frame
+waits, TensorFlow inference, HTTP, SQLite) is pushed to executors so no
+stage waits behind another.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, List
+
+import cv2
+import numpy as np
+
+from .camera import CameraService
+from .config import ClientConfig
+from .face_recognition import FaceRecognizer
+from .governor import FrameGovernor
+from .hardware import DoorController
+from .inference import InferenceBatcher, FrameResult
+from .metrics import metrics
+from .motion import MotionGate
+from .outbox import AccessLogOutbox
+from .room_monitor import RoomMonitor
+from .session import VerifiedSessionCache
+
+logger = logging.getLogger(__name__)
+
+
+class DoorRuntime:
+    """One door's state machine: current booking, camera, verification and relay timing."""
+    
+    def __init__(self, runtime: 'AccessRuntime', monitor: RoomMonitor, door_controller: DoorController,
+                 camera: CameraService = None, motion_gate: MotionGate = None):
+        """
+        Initialize the door.
+        
+        Args:
+            runtime: AccessRuntime sharing inference, sync and the outbox
+            monitor: RoomMonitor for the door's room
+            door_controller: DoorController driving the door's relay
+            camera: CameraService for the door camera (defaults to the configured camera)
+            motion_gate: MotionGate run before detection (defaults per MOTION_GATE_ENABLED)
+        """
+        self.runtime = runtime
+        self.monitor = monitor
+        self.door_controller = door_controller
+        self.camera = camera or CameraService()
+        if motion_gate is None and ClientConfig.MOTION_GATE_ENABLED:
+            motion_gate = MotionGate()
+        self.motion_gate = motion_gate
+        self.name = f"Room {monitor.room_id}"
+        
+        self.booking: Optional[Dict] = None
+        self.expected_identity: Optional[str] = None
+        self.detection_count = 0
+        self.sessions = VerifiedSessionCache()
+        self._denied = False  # A face failed to verify during this booking
+        self._granted = False  # The door was unlocked during this booking
+        
+        self._booking_active: Optional[asyncio.Event] = None
+        self._unlock_requested: Optional[asyncio.Event] = None
+        self._resume_at = 0.0
+        self._last_processed = 0.0
+        self._prewarming = False
+        self._prewarmed_id: Optional[int] = None
+    
+    def tasks(self) -> list:
+        """Create this door's coroutines."""
+        self._booking_active = asyncio.Event()
+        self._unlock_requested = asyncio.Event()
+        return [
+            self._booking_task(),
+            self._camera_task(),
+            self._prewarm_task(),
+            self._recognition_task(),
+            self._door_task(),
+        ]
+    
+    async def shutdown(self):
+        """Lock the door and release the camera."""
+        if self.door_controller.is_unlocked:
+            self.door_controller.lock()
+        await asyncio.get_running_loop().run_in_executor(self.runtime.camera_executor, self.camera.stop)
+    
+    async def _booking_task(self):
+        """Track the current booking from the local cache."""
+        while True:
+            try:
+                # In-memory timeline lookup; cheap enough to run on the loop
+                self._set_booking(self.monitor.get_current_booking())
+            except Exception as e:
+                logger.error(f"{self.name}: booking check error: {str(e)}", exc_info=True)
+            await asyncio.sleep(1)
+    
+    def _set_booking(self, booking: Optional[Dict]):
+        """Switch to a new current booking, resetting verification state."""
+        booking_id = booking.get('BookingID') if booking else None
+        current_id = self.booking.get('BookingID') if self.booking else None
+        if booking_id == current_id:
+            return
+        
+        if self._denied and not self._granted:
+            # Count each booking that ended without its user getting in once, not every frame
+            metrics.inc('aria_denials_total', room=self.monitor.room_id)
+        self._denied = self._granted = False
+        
+        self.booking = booking
+        self.detection_count = 0
+        self.sessions.prune()
+        if self.motion_gate:
+            self.motion_gate.reset()
+        self.expected_identity = self.monitor.get_expected_user(booking) if booking else None
+        
+        if not booking:
+            logger.info(f"{self.name}: no active booking")
+            self._booking_active.clear()
+        elif not self.expected_identity:
+            logger.warning(f"{self.name}: could not determine expected user from booking")
+            self._booking_active.clear()
+        else:
+            logger.info(f"{self.name}: active booking found for user: {self.expected_identity}")
+            self._booking_active.set()
+    
+    async def _camera_task(self):
+        """
+        Keep the camera open while it is needed, retrying if it fails to start.
+        
+        With CAMERA_KEEP_WARM it stays open; otherwise it opens for the
+        prewarm lead-up and the booking itself.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            needed = ClientConfig.CAMERA_KEEP_WARM or self._prewarming or self._booking_active.is_set()
+            if needed and not self.camera.running:
+                started = await loop.run_in_executor(self.runtime.camera_executor, self.camera.start)
+                if not started:
+                    logger.error(f"{self.name}: camera unavailable; retrying")
+                    await asyncio.sleep(5)
+                    continue
+            elif not needed and self.camera.running:
+                await loop.run_in_executor(self.runtime.camera_executor, self.camera.stop)
+            await asyncio.sleep(1)
+    
+    async def _prewarm_task(self):
+        """Get ready for the next booking before it starts."""
+        while True:
+            try:
+                await self._prewarm()
+            except Exception as e:
+                logger.error(f"{self.name}: prewarm error: {str(e)}", exc_info=True)
+            await asyncio.sleep(1)
+    
+    async def _prewarm(self):
+        """
+        Within PREWARM_SECONDS of the next booking: make sure the booked user
+        is in the face gallery, warm up the model and (via _camera_task) open
+        the camera, so none of it happens while the user waits at the door.
+        """
+        booking = self.monitor.get_next_booking()
+        lead = None
+        if booking:
+            lead = (datetime.fromisoformat(booking['Start']) - datetime.now()).total_seconds()
+        
+        self._prewarming = lead is not None and lead <= ClientConfig.PREWARM_SECONDS
+        if not self._prewarming or booking['BookingID'] == self._prewarmed_id:
+            return
+        self._prewarmed_id = booking['BookingID']
+        
+        identity = self.monitor.get_expected_user(booking)
+        logger.info(f"{self.name}: booking {booking['BookingID']} starts in {lead:.0f}s, "
+                    f"prewarming for {identity}")
+        await self.runtime.prewarm(identity)
+    
+    async def _recognition_task(self):
+        """Verify faces in captured frames against the booked user."""
+        loop = asyncio.get_running_loop()
+        batcher = self.runtime.batcher
+        governor = self.runtime.governor
+        required_detections = ClientConfig.FACE_DETECTION_COUNT_THRESHOLD
+        frame: Optional[np.ndarray] = None
+        seq = 0
+        
+        while True:
+            await self._booking_active.wait()
+            expected_identity = self.expected_identity
+            
+            # Nothing to verify while the door is open or just after it relocks
+            if not expected_identity or self.door_controller.is_unlocked or loop.time() < self._resume_at:
+                await asyncio.sleep(0.1)
+                continue
+            
+            if not self.camera.running:
+                # _camera_task is (re)opening it
+                await asyncio.sleep(0.1)
+                continue
+            
+            if governor:
+                # Cap this door's processing rate
+                wait = self._last_processed + governor.min_interval - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            if frame is None or frame.shape != self.camera.frame_shape:
+                # Allocated once and reused for every frame
+                frame = self.camera.new_frame_buffer()
+            
+            latest = await loop.run_in_executor(
+                self.runtime.camera_executor, self.camera.read_latest, frame, seq
+            )
+            if not latest:
+                continue
+            seq = latest
+            
+            reentry = False
+            if self.motion_gate and not self.motion_gate.check(frame, loop.time()):
+                # Nothing moved: skip detection and count what it would have cost
+                result = None
+                metrics.inc('aria_frames_skipped_total', room=self.monitor.room_id, reason='motion')
+                metrics.inc('aria_cpu_seconds_saved_total', batcher.frame_cpu_seconds, room=self.monitor.room_id)
+            else:
+                self._last_processed = loop.time()
+                result = await batcher.submit(frame, expected_identity)
+                if governor:
+                    governor.record_latency(loop.time() - self._last_processed)
+                metrics.inc('aria_frames_processed_total', room=self.monitor.room_id)
+                box, identity, confidence = result
+            
+                # The booking may have changed while inference ran
+                if expected_identity != self.expected_identity:
+                    continue
+            
+                verified = identity == expected_identity and confidence >= ClientConfig.FACE_CONFIDENCE_THRESHOLD
+                if box is not None:
+                    metrics.inc('aria_face_checks_total', room=self.monitor.room_id,
+                                result='match' if verified else 'mismatch')
+                    if not verified:
+                        self._denied = True
+                
+                if verified and (confidence >= ClientConfig.REENTRY_CONFIDENCE_THRESHOLD
+                                 and self.sessions.is_verified(self.booking['BookingID'], expected_identity)):
+                    # Already fully verified during this booking: one confident match is enough
+                    logger.info(f"{self.name}: re-entry verified: {identity} (confidence: {confidence:.2%})")
+                    reentry = True
+                elif verified:
+                    self.detection_count += 1
+                    logger.info(f"{self.name}: face verified: {identity} (confidence: {confidence:.2%}, "
+                                f"count: {self.detection_count}/{required_detections})")
+            
+            if ClientConfig.SHOW_PREVIEW and self._show_preview(frame, result, expected_identity):
+                logger.info(f"{self.name}: face recognition cancelled by user")
+                self.detection_count = 0
+                continue
+            
+            if reentry:
+                self.detection_count = 0
+                metrics.inc('aria_reentries_total', room=self.monitor.room_id)
+                self._grant_access(expected_identity)
+            elif self.detection_count >= required_detections:
+                self.detection_count = 0
+                self.sessions.mark_verified(self.booking['BookingID'], expected_identity)
+                self._grant_access(expected_identity)
+    
+    def _show_preview(self, frame: np.ndarray, result: Optional[FrameResult], expected_identity: str) -> bool:
+        """
+        Draw the recognition result and show it in this door's window.
+        
+        Args:
+            frame: Frame to draw on
+            result: Recognition result, or None if the motion gate skipped the frame
+            expected_identity: Booked user's ID
+        
+        Returns:
+            True if the user pressed 'q' to cancel
+        """
+        box, identity, confidence = result or (None, None, 0.0)
+        
+        if result is None:
+            cv2.putText(frame, "Idle", (50, 50),
+                        cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 0), 2)
+        elif box is not None:
+            x1, x2, y1, y2 = box
+            if identity == expected_identity and confidence >= ClientConfig.FACE_CONFIDENCE_THRESHOLD:
+                # Draw green rectangle
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(frame, f"{identity} ({confidence:.1%})", (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            else:
+                # Draw red rectangle
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                if identity:
+                    cv2.putText(frame, f"Unknown ({confidence:.1%})", (x1, y1 - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        else:
+            cv2.putText(frame, "No face found", (50, 50),
+                        cv2.FONT_HERSHEY_COMPLEX, 1, (0, 255, 0), 2)
+        
+        cv2.imshow(f'Face Recognition - {self.name}', frame)
+        return cv2.waitKey(1) & 0xFF == ord('q')
+    
+    def _grant_access(self, expected_identity: str):
+        """Unlock the door and queue the access event."""
+        logger.info(f"{self.name}: access granted - unlocking door")
+        self._unlock_requested.set()
+        self._granted = True
+        metrics.inc('aria_unlocks_total', room=self.monitor.room_id)
+        
+        # Determine user type
+        stud_id = expected_identity if self.booking and self.booking.get('StudID') == expected_identity else None
+        staff_id = expected_identity if stud_id is None else None
+        
+        # Local SQLite insert; delivery happens in the runtime's outbox task
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.runtime.outbox.enqueue(self.monitor.room_id, stud_id, staff_id, status=1, timestamp=timestamp)
+    
+    async def _door_task(self):
+        """Drive the relay: unlock on request, relock after the unlock duration."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._unlock_requested.wait()
+            self._unlock_requested.clear()
+            
+            with metrics.timer('aria_stage_seconds', stage='relay'):
+                self.door_controller.unlock()
+            await asyncio.sleep(self.door_controller.unlock_duration)
+            with metrics.timer('aria_stage_seconds', stage='relay'):
+                self.door_controller.lock()
+            
+            self._resume_at = loop.time() + ClientConfig.REVERIFY_DELAY_SECONDS
+
+
+class AccessRuntime:
+    """Runs the access control loops of one or more doors on asyncio."""
+    
+    def __init__(self, face_recognizer: FaceRecognizer, outbox: AccessLogOutbox, refresh_gallery=None,
+                 governor: FrameGovernor = None):
+        """
+        Initialize the runtime.
+        
+        Args:
+            face_recognizer: Loaded FaceRecognizer shared by all doors
+            outbox: AccessLogOutbox for access events
+            refresh_gallery: Optional callable refreshing the face gallery, run after
+                each booking sync and when prewarming for a user missing from it
+            governor: FrameGovernor pacing recognition (defaults per GOVERNOR_ENABLED)
+        """
+        self.face_recognizer = face_recognizer
+        self.outbox = outbox
+        self.refresh_gallery = refresh_gallery
+        if governor is None and ClientConfig.GOVERNOR_ENABLED:
+            governor = FrameGovernor()
+        self.governor = governor
+        self.doors: List[DoorRuntime] = []
+        
+        # TensorFlow inference stays on one thread; frame waits get their own
+        # (one per door) so they never queue behind a slow embedding
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.camera_executor: Optional[ThreadPoolExecutor] = None
+        self._io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='io')
+        self.batcher = InferenceBatcher(face_recognizer, self.inference_executor)
+    
+    def add_door(self, monitor: RoomMonitor, door_controller: DoorController,
+                 camera: CameraService = None, motion_gate: MotionGate = None) -> DoorRuntime:
+        """
+        Add a door served by this runtime.
+        
+        Args:
+            monitor: RoomMonitor for the door's room
+            door_controller: DoorController driving the door's relay
+            camera: CameraService for the door camera (defaults to the configured camera)
+            motion_gate: MotionGate run before detection (defaults per MOTION_GATE_ENABLED)
+        """
+        door = DoorRuntime(self, monitor, door_controller, camera, motion_gate)
+        self.doors.append(door)
+        return door
+    
+    async def run(self):
+        """Run all tasks until cancelled."""
+        self.camera_executor = ThreadPoolExecutor(max_workers=len(self.doors), thread_name_prefix='camera')
+        self.batcher.max_batch = len(self.doors)
+        
+        # The batcher starts first so its queue exists before any door submits
+        coroutines = [self.batcher.run(), self._sync_task(), self._outbox_task(), self._metrics_task()]
+        if self.governor:
+            coroutines.append(self._governor_task())
+        for door in self.doors:
+            coroutines.extend(door.tasks())
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for door in self.doors:
+                await door.shutdown()
+            cv2.destroyAllWindows()
+            self.camera_executor.shutdown(wait=True)
+            self.inference_executor.shutdown(wait=True)
+            self._io_executor.shutdown(wait=True)
+            metrics.log_summary()
+    
+    async def _run_io(self, func, *args):
+        """Run blocking IO (HTTP, SQLite) off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, func, *args)
+    
+    async def prewarm(self, identity: Optional[str]):
+        """Make sure identity is in the face gallery and warm up the model."""
+        if identity and not self.face_recognizer.has_identity(identity) and self.refresh_gallery:
+            # The user may have registered since the last sync
+            await self._run_io(self.refresh_gallery)
+        if identity and not self.face_recognizer.has_identity(identity):
+            logger.warning(f"No reference embeddings for {identity} in the face gallery")
+        
+        await asyncio.get_running_loop().run_in_executor(
+            self.inference_executor, self.face_recognizer.warm_up
+        )
+    
+    async def _sync_task(self):
+        """Sync every door's bookings (and the face gallery) from the server."""
+        while True:
+            for door in self.doors:
+                try:
+                    await self._run_io(door.monitor.sync)
+                except Exception as e:
+                    logger.error(f"{door.name}: booking sync error: {str(e)}", exc_info=True)
+            try:
+                if self.refresh_gallery:
+                    await self._run_io(self.refresh_gallery)
+            except Exception as e:
+                logger.error(f"Face gallery refresh error: {str(e)}", exc_info=True)
+            await asyncio.sleep(ClientConfig.BOOKING_CHECK_INTERVAL)
+    
+    async def _outbox_task(self):
+        """Flush queued access events to the server."""
+        while True:
+            try:
+                await self._run_io(self.outbox.flush)
+            except Exception as e:
+                logger.error(f"Outbox flush error: {str(e)}", exc_info=True)
+            await asyncio.sleep(ClientConfig.OUTBOX_FLUSH_INTERVAL)
+
+    async def _governor_task(self):
+        """Re-evaluate the processing rate and detection scale."""
+        while True:
+            try:
+                self.governor.update()
+                self.batcher.detection_scale = self.governor.detection_scale
+            except Exception as e:
+                logger.error(f"Governor error: {str(e)}", exc_info=True)
+            await asyncio.sleep(ClientConfig.GOVERNOR_INTERVAL)
+    
+    async def _metrics_task(self):
+        """Periodically log client metrics."""
+        while True:
+            await asyncio.sleep(ClientConfig.METRICS_LOG_INTERVAL)
+            metrics.log_summary()
@@ -0,0 +1,56 @@
+"""
+Verified-session cache for re-entry during a booking.
+"""
+import time
+import logging
+from typing import Dict, Tuple
+
+from .config import ClientConfig
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedSessionCache:
+    """
+    Remembers which bookings' users have passed full verification.
+    
+    Entries are keyed by booking ID and expire REENTRY_TTL_SECONDS after
+    the full verification that created them. Re-entries on the fast path
+    don't extend an entry, so at least one full multi-frame verification
+    happens per TTL.
+    """
+    
+    def __init__(self, ttl: float = None, clock=time.monotonic):
+        """
+        Initialize cache.
+        
+        Args:
+            ttl: Seconds a full verification stays valid for re-entry (0 disables)
+            clock: Monotonic time source
+        """
+        self.ttl = ClientConfig.REENTRY_TTL_SECONDS if ttl is None else ttl
+        self.clock = clock
+        self._sessions: Dict[int, Tuple[str, float]] = {}
+    
+    def mark_verified(self, booking_id: int, identity: str):
+        """Record a full verification of the booked user."""
+        if self.ttl > 0:
+            self._sessions[booking_id] = (identity, self.clock() + self.ttl)
+    
+    def is_verified(self, booking_id: int, identity: str) -> bool:
+        """Check whether identity was fully verified for booking_id within the TTL."""
+        session = self._sessions.get(booking_id)
+        if session is None:
+            return False
+        
+        verified_identity, expires_at = session
+        if self.clock() >= expires_at:
+            del self._sessions[booking_id]
+            return False
+        return verified_identity == identity
+    
+    def prune(self):
+        """Drop expired sessions."""
+        now = self.clock()
+        for booking_id in [b for b, (_, expires_at) in self._sessions.items() if now >= expires_at]:
+            del self._sessions[booking_id]
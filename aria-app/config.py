@@ -34,6 +34,34 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', '16777216'))  # 16 MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     
+    # Booking conflict checks: seconds a room's in-process availability index is
+    # trusted before reloading (other server processes don't invalidate it)
+    AVAILABILITY_INDEX_TTL = int(os.environ.get('AVAILABILITY_INDEX_TTL', '60'))
+    
+    # Booking creation locks the room row; give up waiting after this many seconds
+    # and retry with jittered backoff (base delay in seconds)
+    BOOKING_LOCK_TIMEOUT = int(os.environ.get('BOOKING_LOCK_TIMEOUT', '5'))
+    BOOKING_LOCK_RETRIES = int(os.environ.get('BOOKING_LOCK_RETRIES', '3'))
+    BOOKING_LOCK_RETRY_SECONDS = float(os.environ.get('BOOKING_LOCK_RETRY_SECONDS', '0.05'))
+    
+    # Seconds between passes moving bookings Upcoming -> Ongoing -> Completed
+    # (0 disables the in-process scheduler; run `flask bookings update-statuses` from cron instead)
+    BOOKING_LIFECYCLE_INTERVAL = int(os.environ.get('BOOKING_LIFECYCLE_INTERVAL', '60'))
+    
+    # `flask archive` moves finished bookings and access logs older than this
+    # into the history tables, this many rows per transaction
+    ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '365'))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '1000'))
+    
+    # Timetable import: rows validated, conflict-checked and inserted per transaction
+    TIMETABLE_IMPORT_BATCH_SIZE = int(os.environ.get('TIMETABLE_IMPORT_BATCH_SIZE', '500'))
+    
+    # Bookings per page on My Bookings and the admin booking pages
+    BOOKING_PAGE_SIZE = int(os.environ.get('BOOKING_PAGE_SIZE', '50'))
+    
+    # Access log entries per page when the API includes archived entries
+    ACCESS_LOG_PAGE_SIZE = int(os.environ.get('ACCESS_LOG_PAGE_SIZE', '100'))
+    
     # Face Recognition
     FACES_DB_PATH = BASE_DIR / 'website' / 'static' / 'MalaysianFacesDB'
     FACES_EMBEDDINGS_PATH = BASE_DIR / 'website' / 'static' / 'registered-faces-db-embeddings.npz'
@@ -75,6 +103,7 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    BOOKING_LIFECYCLE_INTERVAL = 0
 
 
 config = {
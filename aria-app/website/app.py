@@ -59,6 +59,26 @@ def create_app(config_name: str = None) -> Flask:
     app.register_blueprint(bookings)
     app.register_blueprint(apiroute, url_prefix='/api')
     
+    # `flask schema upgrade|status|check-plans`, `flask bookings update-statuses`, `flask archive`
+    from .migrations import schema_cli
+    from .cli import bookings_cli, archive
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(bookings_cli)
+    app.cli.add_command(archive)
+    
+    # Move bookings Upcoming -> Ongoing -> Completed in the background
+    lifecycle_interval = app.config.get('BOOKING_LIFECYCLE_INTERVAL', 0)
+    if lifecycle_interval > 0:
+        from .services.booking_lifecycle import BookingLifecycleScheduler
+        scheduler = BookingLifecycleScheduler(app, lifecycle_interval)
+        app.extensions['booking_lifecycle'] = scheduler
+        
+        # Started by the first request, so only processes that serve run it: not
+        # CLI commands, nor the debug reloader's watcher process
+        @app.before_request
+        def start_booking_lifecycle():
+            scheduler.start()
+    
     # Note: API is already initialized with the blueprint in routes/api/__init__.py
     # and namespace is already added there. No need for init_app or add_namespace here.
     
@@ -0,0 +1,38 @@
+"""`flask bookings` and `flask archive` commands."""
+import click
+from flask.cli import AppGroup, with_appcontext
+
+bookings_cli = AppGroup('bookings', help="Booking maintenance.")
+
+
+@bookings_cli.command('update-statuses')
+def update_statuses():
+    """Move bookings Upcoming -> Ongoing -> Completed (for cron when the scheduler is off)."""
+    from .services.booking_lifecycle import BookingLifecycle
+    
+    counts = BookingLifecycle.update_statuses()
+    click.echo(f"Started: {counts['started']}  Completed: {counts['completed']}")
+
+
+@bookings_cli.command('rebuild-occupancy')
+def rebuild_occupancy():
+    """Rebuild roomoccupancy from active bookings (after editing bookings outside the app)."""
+    from .models.base import db
+    from .services.occupancy_service import OccupancyService
+    
+    OccupancyService.rebuild()
+    db.session.commit()
+    click.echo("Room occupancy rebuilt")
+
+
+@click.command('archive')
+@click.option('--retention-days', type=int, help="Keep rows newer than this (default ARCHIVE_RETENTION_DAYS).")
+@click.option('--batch-size', type=int, help="Rows moved per transaction (default ARCHIVE_BATCH_SIZE).")
+@with_appcontext
+def archive(retention_days, batch_size):
+    """Move finished bookings and old access logs into the history tables."""
+    from .services.archival_service import ArchivalService
+    
+    moved = ArchivalService.archive(retention_days=retention_days, batch_size=batch_size)
+    for table, count in moved.items():
+        click.echo(f"{table}: {count} archived")
@@ -0,0 +1,11 @@
+"""Versioned schema migrations."""
+from .runner import Migration, MigrationRunner
+from .versions import MIGRATIONS
+from .cli import schema_cli
+
+__all__ = [
+    'Migration',
+    'MigrationRunner',
+    'MIGRATIONS',
+    'schema_cli',
+]
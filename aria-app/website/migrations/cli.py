@@ -0,0 +1,56 @@
+"""`flask schema` commands."""
+import click
+from flask.cli import AppGroup
+from ..models.base import db
+from .runner import MigrationRunner
+from .versions import MIGRATIONS
+
+schema_cli = AppGroup('schema', help="Database schema migrations.")
+
+
+def get_runner() -> MigrationRunner:
+    """Runner over the app database and all migrations."""
+    return MigrationRunner(db.engine, MIGRATIONS)
+
+
+@schema_cli.command('status')
+def status():
+    """Show the applied schema version and pending migrations."""
+    runner = get_runner()
+    click.echo(f"Schema version: {runner.current_version()}")
+    for migration in runner.pending():
+        click.echo(f"  pending {migration.version}: {migration.description}")
+
+
+@schema_cli.command('upgrade')
+@click.option('--to', 'target', type=int, help="Stop at this version (default: latest).")
+def upgrade(target):
+    """Apply pending migrations."""
+    runner = get_runner()
+    applied = runner.upgrade(target)
+    for migration in applied:
+        click.echo(f"Applied {migration.version}: {migration.description}")
+    click.echo(f"Schema version: {runner.current_version()}")
+
+
+@schema_cli.command('check-plans')
+def check_plans():
+    """EXPLAIN the hot service queries and fail if any misses its index."""
+    from .plans import check_query_plans
+    
+    if get_runner().pending():
+        raise click.ClickException("Migrations are pending; run `flask schema upgrade` first")
+    
+    results = check_query_plans()
+    if not results:
+        raise click.ClickException(f"Query plans can't be checked on {db.engine.dialect.name}")
+    
+    for result in results:
+        mark = 'ok  ' if result['ok'] else 'MISS'
+        click.echo(f"{mark} {result['name']} ({result['table']}): "
+                   f"expected {result['expected']}, used {result['used'] or 'full scan'}")
+    
+    missed = sum(1 for result in results if not result['ok'])
+    if missed:
+        raise click.ClickException(f"{missed} of {len(results)} hot queries don't use their index")
+    click.echo(f"All {len(results)} hot queries use their index")
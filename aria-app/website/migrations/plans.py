@@ -0,0 +1,137 @@
+"""Query-plan checks for the hot queries."""
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from ..models.base import db
+from ..models.face import RegisteredFace
+from ..services.access_service import AccessLogService
+from ..services.availability_index import AvailabilityIndex
+from ..services.booking_service import BookingService
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROOM_OCCUPANCY = {'roomoccupancy': 'ix_roomoccupancy_room_start_end'}
+
+# SQLite: "SEARCH roombookings USING INDEX ix_... (RoomID=?)"
+_SQLITE_PLAN = re.compile(r'^(?:SEARCH|SCAN) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?')
+
+
+def hot_queries() -> List[Tuple[str, Callable, Dict[str, str]]]:
+    """
+    The queries worth an index, as (name, service call, {table: expected index}).
+    
+    The calls use IDs that match nothing; only their SQL matters.
+    """
+    now = datetime.now()
+    window = (now, now + timedelta(days=1))
+    return [
+        ("Student's room bookings", lambda: BookingService.list_bookings('room', stud_id=''),
+         {'roombookings': 'ix_roombookings_stud_start'}),
+        ("Staff's room bookings", lambda: BookingService.list_bookings('room', staff_id=''),
+         {'roombookings': 'ix_roombookings_staff_start'}),
+        ("Student's event bookings", lambda: BookingService.list_bookings('event', stud_id=''),
+         {'eventbookings': 'ix_eventbookings_stud_start'}),
+        ("Staff's event bookings", lambda: BookingService.list_bookings('event', staff_id=''),
+         {'eventbookings': 'ix_eventbookings_staff_start'}),
+        ("Admin room booking list", lambda: BookingService.list_bookings('room', after=(now, 0)),
+         {'roombookings': 'ix_roombookings_start'}),
+        ("Admin event booking list", lambda: BookingService.list_bookings('event', after=(now, 0)),
+         {'eventbookings': 'ix_eventbookings_start'}),
+        ("Availability index load", lambda: AvailabilityIndex._load(0), ROOM_OCCUPANCY),
+        ("Booking conflict check", lambda: BookingService._has_conflict(0, *window), ROOM_OCCUPANCY),
+        ("Room's active bookings", lambda: BookingService.get_active_room_booking_ids(0, *window),
+         ROOM_OCCUPANCY),
+        ("Room sync window", lambda: BookingService.get_room_bookings_in_window(0, *window),
+         {'roombookings': 'ix_roombookings_room_start_end_status'}),
+        ("Free-slot search", lambda: BookingService.find_free_slots([0], window, timedelta(hours=1)),
+         ROOM_OCCUPANCY),
+        ("Calendar feed, all rooms", lambda: BookingService.get_calendar_bookings(*window),
+         {'roombookings': 'ix_roombookings_end_start', 'eventbookings': 'ix_eventbookings_end_start'}),
+        ("Calendar feed, one room", lambda: BookingService.get_calendar_bookings(*window, room_id=0),
+         {'roombookings': 'ix_roombookings_room_start_end_status',
+          'eventbookings': 'ix_eventbookings_room_start_end_status'}),
+        ("Room access log", lambda: AccessLogService.get_logs(room_id=0, start=now),
+         {'roomaccesslog': 'ix_roomaccesslog_room_timestamp'}),
+        ("Access log with archived entries", lambda: AccessLogService.list_logs(
+            after=(now, 0), include_archived=True),
+         {'roomaccesslog': 'ix_roomaccesslog_timestamp',
+          'roomaccesslog_history': 'ix_roomaccesslog_history_timestamp'}),
+        ("Student's registered face", lambda: db.session.query(RegisteredFace).filter_by(StudID='').first(),
+         {'registeredfaces': 'ix_registeredfaces_stud'}),
+        ("Staff's registered face", lambda: db.session.query(RegisteredFace).filter_by(StaffID='').first(),
+         {'registeredfaces': 'ix_registeredfaces_staff'}),
+    ]
+
+
+def capture_statements(call: Callable) -> List[Tuple[str, object]]:
+    """Run a service call and return the SQL statements it executed."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.rollback()
+    return statements
+
+
+def indexes_used(statement: str, parameters) -> Optional[Dict[str, Optional[str]]]:
+    """
+    EXPLAIN a statement.
+    
+    Returns:
+        {table: index used, or None for a full scan}, or None if the
+        database isn't MySQL or SQLite
+    """
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        if dialect == 'mysql':
+            rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+            return {row['table']: row['key'] for row in rows if row['table']}
+        if dialect == 'sqlite':
+            used = {}
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                match = _SQLITE_PLAN.match(row[-1])
+                if match:
+                    used[match.group(1)] = match.group(2)
+            return used
+    return None
+
+
+def check_query_plans() -> List[Dict]:
+    """
+    Check that each hot query is served by its index.
+    
+    Run it against a database with realistic data: on near-empty tables
+    MySQL may prefer a full scan, which says nothing about production.
+    
+    Returns:
+        One result per query and table: name, table, expected, used, ok
+    """
+    results = []
+    for name, call, expected in hot_queries():
+        used = {}
+        for statement, parameters in capture_statements(call):
+            plan = indexes_used(statement, parameters)
+            if plan is None:
+                logger.warning(f"Query plans can't be checked on {db.engine.dialect.name}")
+                return []
+            for table, index in plan.items():
+                if table in expected and used.get(table) is None:
+                    used[table] = index
+        
+        for table, index in expected.items():
+            results.append({
+                'name': name,
+                'table': table,
+                'expected': index,
+                'used': used.get(table),
+                'ok': used.get(table) == index
+            })
+    return results
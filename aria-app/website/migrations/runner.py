@@ -0,0 +1,79 @@
+"""Migration runner."""
+from datetime import datetime
+from typing import Callable, List, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection, Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+class Migration:
+    """One schema change, identified by an increasing version number."""
+    
+    def __init__(self, version: int, description: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+    
+    def __repr__(self):
+        return f'<Migration {self.version}: {self.description}>'
+
+
+class MigrationRunner:
+    """
+    Applies pending migrations in version order and records each one in
+    the schema_version table.
+    
+    MySQL commits DDL implicitly, so a migration that fails halfway cannot be
+    rolled back; migrations are written to skip steps that already happened
+    and can simply be run again.
+    """
+    
+    def __init__(self, engine: Engine, migrations: List[Migration]):
+        self.engine = engine
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+    
+    def current_version(self) -> int:
+        """Highest applied version (0 for a database never migrated)."""
+        schema_version.create(self.engine, checkfirst=True)
+        with self.engine.connect() as conn:
+            versions = conn.execute(select(schema_version.c.version)).scalars().all()
+        return max(versions, default=0)
+    
+    def pending(self) -> List[Migration]:
+        """Migrations not yet applied."""
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+    
+    def upgrade(self, target: Optional[int] = None) -> List[Migration]:
+        """
+        Apply pending migrations up to target (default: all).
+        
+        Returns:
+            The migrations applied
+        """
+        applied = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            
+            logger.info(f"Applying migration {migration.version}: {migration.description}")
+            with self.engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(schema_version.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.utcnow()
+                ))
+            applied.append(migration)
+        return applied
@@ -0,0 +1,103 @@
+"""Schema migrations, applied in version order."""
+from typing import List
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from ..models.history import RoomBookingHistory, EventBookingHistory, RoomAccessLogHistory
+from ..models.room import RoomOccupancy
+from .runner import Migration
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def column_exists(conn: Connection, table: str, column: str) -> bool:
+    """Check whether a table has a column."""
+    return any(c['name'] == column for c in inspect(conn).get_columns(table))
+
+
+def index_exists(conn: Connection, table: str, name: str) -> bool:
+    """Check whether a table has an index with this name."""
+    return any(i['name'] == name for i in inspect(conn).get_indexes(table))
+
+
+def add_index(conn: Connection, table: str, name: str, columns: List[str]):
+    """Create an index unless it exists (databases built by db.create_all() already have it)."""
+    if index_exists(conn, table, name):
+        return
+    conn.execute(text(
+        f"CREATE INDEX {_quote(conn, name)} ON {_quote(conn, table)} "
+        f"({', '.join(_quote(conn, c) for c in columns)})"
+    ))
+
+
+def _booking_sync_and_conflict_indexes(conn: Connection):
+    # Edge-device sync cursor
+    if not column_exists(conn, 'roombookings', 'UpdatedAt'):
+        on_update = ' ON UPDATE CURRENT_TIMESTAMP' if conn.dialect.name == 'mysql' else ''
+        conn.execute(text(
+            f"ALTER TABLE roombookings ADD COLUMN {_quote(conn, 'UpdatedAt')} DATETIME NOT NULL "
+            f"DEFAULT CURRENT_TIMESTAMP{on_update}"
+        ))
+    
+    # Conflict checks, free-slot search and room sync
+    add_index(conn, 'roombookings', 'ix_roombookings_room_start_end_status',
+              ['RoomID', 'Start', 'End', 'RBookStatus'])
+    add_index(conn, 'eventbookings', 'ix_eventbookings_room_start_end_status',
+              ['RoomID', 'Start', 'End', 'EbookStatus'])
+
+
+def _user_log_and_face_indexes(conn: Connection):
+    # My Bookings: a user's bookings, newest first
+    add_index(conn, 'roombookings', 'ix_roombookings_stud_start', ['StudID', 'Start'])
+    add_index(conn, 'roombookings', 'ix_roombookings_staff_start', ['StaffID', 'Start'])
+    add_index(conn, 'eventbookings', 'ix_eventbookings_stud_start', ['StudID', 'Start'])
+    add_index(conn, 'eventbookings', 'ix_eventbookings_staff_start', ['StaffID', 'Start'])
+    
+    # A room's access log over time
+    add_index(conn, 'roomaccesslog', 'ix_roomaccesslog_room_timestamp', ['RoomID', 'Timestamp'])
+    
+    # Home pages: the user's registered face
+    add_index(conn, 'registeredfaces', 'ix_registeredfaces_stud', ['StudID'])
+    add_index(conn, 'registeredfaces', 'ix_registeredfaces_staff', ['StaffID'])
+
+
+def _history_tables(conn: Connection):
+    for model in (RoomBookingHistory, EventBookingHistory, RoomAccessLogHistory):
+        model.__table__.create(conn, checkfirst=True)
+
+
+def _room_occupancy(conn: Connection):
+    from ..services.occupancy_service import OccupancyService
+    
+    RoomOccupancy.__table__.create(conn, checkfirst=True)
+    OccupancyService.rebuild(bind=conn)
+
+
+def _calendar_indexes(conn: Connection):
+    # Calendar feed across all rooms
+    add_index(conn, 'roombookings', 'ix_roombookings_end_start', ['End', 'Start'])
+    add_index(conn, 'eventbookings', 'ix_eventbookings_end_start', ['End', 'Start'])
+
+
+def _booking_list_indexes(conn: Connection):
+    # Admin booking lists, newest first (history tables too, for ?archived=1)
+    for table in ('roombookings', 'eventbookings', 'roombookings_history', 'eventbookings_history'):
+        add_index(conn, table, f'ix_{table}_start', ['Start'])
+
+
+def _access_log_list_indexes(conn: Connection):
+    # Paged access log API across all rooms (history too, for include_archived)
+    for table in ('roomaccesslog', 'roomaccesslog_history'):
+        add_index(conn, table, f'ix_{table}_timestamp', ['Timestamp'])
+
+
+MIGRATIONS = [
+    Migration(1, "Booking sync cursor and room conflict indexes", _booking_sync_and_conflict_indexes),
+    Migration(2, "User booking, access log and registered face indexes", _user_log_and_face_indexes),
+    Migration(3, "History tables for archived bookings and access logs", _history_tables),
+    Migration(4, "Room occupancy table, filled from active bookings", _room_occupancy),
+    Migration(5, "Booking indexes for the calendar feed", _calendar_indexes),
+    Migration(6, "Start indexes for the paginated booking lists", _booking_list_indexes),
+    Migration(7, "Timestamp indexes for the paged access log", _access_log_list_indexes),
+]
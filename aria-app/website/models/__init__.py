@@ -1,11 +1,12 @@
 """Database models for ARIA application."""
 from .user import Student, Staff, Admin
 from .announcement import Announcement
-from .room import RoomList, RoomBooking, EventBooking
+from .room import RoomList, RoomBooking, EventBooking, RoomOccupancy
 from .face import RegisteredFace
 from .access import RoomAccessLog
 from .feedback import Feedback
 from .report import Report
+from .history import RoomBookingHistory, EventBookingHistory, RoomAccessLogHistory
 
 __all__ = [
     'Student',
@@ -15,9 +16,13 @@ __all__ = [
     'RoomList',
     'RoomBooking',
     'EventBooking',
+    'RoomOccupancy',
     'RegisteredFace',
     'RoomAccessLog',
     'Feedback',
     'Report',
+    'RoomBookingHistory',
+    'EventBookingHistory',
+    'RoomAccessLogHistory',
 ]
 
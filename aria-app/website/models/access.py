@@ -1,5 +1,5 @@
 """Access log models."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from datetime import datetime
 from .base import db
 
@@ -7,6 +7,12 @@ from .base import db
 class RoomAccessLog(db.Model):
     """Room access log model."""
     __tablename__ = 'roomaccesslog'
+    __table_args__ = (
+        # A room's access history by time
+        Index('ix_roomaccesslog_room_timestamp', 'RoomID', 'Timestamp'),
+        # Paged access log across all rooms, newest first
+        Index('ix_roomaccesslog_timestamp', 'Timestamp'),
+    )
     
     rmaID = Column(Integer, primary_key=True, autoincrement=True)
     RoomID = Column(Integer, ForeignKey('roomlist.RoomID'), nullable=False)
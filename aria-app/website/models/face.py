@@ -1,11 +1,16 @@
 """Face recognition models."""
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from .base import db
 
 
 class RegisteredFace(db.Model):
     """Registered face model."""
     __tablename__ = 'registeredfaces'
+    __table_args__ = (
+        # Looked up by owner on every home page load
+        Index('ix_registeredfaces_stud', 'StudID'),
+        Index('ix_registeredfaces_staff', 'StaffID'),
+    )
     
     FaceID = Column(Integer, primary_key=True, autoincrement=True)
     FaceIMG = Column(Text, nullable=False)  # Paths to face images
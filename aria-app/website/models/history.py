@@ -0,0 +1,81 @@
+"""History tables for archived bookings and access logs."""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index
+from datetime import datetime
+from .base import db
+
+
+class RoomBookingHistory(db.Model):
+    """
+    Archived room booking.
+    
+    Same columns and IDs as roombookings. No foreign keys, so history
+    outlives deleted rooms and users.
+    """
+    __tablename__ = 'roombookings_history'
+    __table_args__ = (
+        Index('ix_roombookings_history_room_start', 'RoomID', 'Start'),
+        Index('ix_roombookings_history_stud_start', 'StudID', 'Start'),
+        Index('ix_roombookings_history_staff_start', 'StaffID', 'Start'),
+        Index('ix_roombookings_history_start', 'Start'),
+    )
+    
+    RBookID = Column(Integer, primary_key=True, autoincrement=False)
+    RoomID = Column(Integer, nullable=False)
+    StudID = Column(String(50), nullable=True)
+    StaffID = Column(String(50), nullable=True)
+    Start = Column(DateTime, nullable=False)
+    End = Column(DateTime, nullable=False)
+    Purpose = Column(Text, nullable=False)
+    RBookStatus = Column(Enum('Upcoming', 'Ongoing', 'Completed', 'Cancelled', name='booking_status'),
+                        nullable=False)
+    UpdatedAt = Column(DateTime, nullable=False)
+    ArchivedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<RoomBookingHistory {self.RBookID}: Room {self.RoomID}>'
+
+
+class EventBookingHistory(db.Model):
+    """Archived event booking (same columns and IDs as eventbookings)."""
+    __tablename__ = 'eventbookings_history'
+    __table_args__ = (
+        Index('ix_eventbookings_history_room_start', 'RoomID', 'Start'),
+        Index('ix_eventbookings_history_stud_start', 'StudID', 'Start'),
+        Index('ix_eventbookings_history_staff_start', 'StaffID', 'Start'),
+        Index('ix_eventbookings_history_start', 'Start'),
+    )
+    
+    EBookID = Column(Integer, primary_key=True, autoincrement=False)
+    RoomID = Column(Integer, nullable=False)
+    StudID = Column(String(50), nullable=True)
+    StaffID = Column(String(50), nullable=True)
+    Start = Column(DateTime, nullable=False)
+    End = Column(DateTime, nullable=False)
+    Purpose = Column(Text, nullable=False)
+    AddDetail = Column(Text, nullable=True)
+    EbookStatus = Column(Enum('Upcoming', 'Ongoing', 'Completed', 'Cancelled', name='booking_status'),
+                        nullable=False)
+    ArchivedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<EventBookingHistory {self.EBookID}: Room {self.RoomID}>'
+
+
+class RoomAccessLogHistory(db.Model):
+    """Archived access log entry (same columns and IDs as roomaccesslog)."""
+    __tablename__ = 'roomaccesslog_history'
+    __table_args__ = (
+        Index('ix_roomaccesslog_history_room_timestamp', 'RoomID', 'Timestamp'),
+        Index('ix_roomaccesslog_history_timestamp', 'Timestamp'),
+    )
+    
+    rmaID = Column(Integer, primary_key=True, autoincrement=False)
+    RoomID = Column(Integer, nullable=False)
+    StudID = Column(String(50), nullable=True)
+    StaffID = Column(String(50), nullable=True)
+    Status = Column(Integer, nullable=False)  # 0 = denied, 1 = granted
+    Timestamp = Column(DateTime, nullable=False)
+    ArchivedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<RoomAccessLogHistory {self.rmaID}: Room {self.RoomID}>'
@@ -1,5 +1,5 @@
 """Room-related models."""
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, UniqueConstraint, func
 from .base import db
 
 
@@ -27,6 +27,17 @@ class RoomList(db.Model):
 class RoomBooking(db.Model):
     """Room booking model."""
     __tablename__ = 'roombookings'
+    __table_args__ = (
+        # Conflict checks and room sync: one room's bookings by time and status
+        Index('ix_roombookings_room_start_end_status', 'RoomID', 'Start', 'End', 'RBookStatus'),
+        # My Bookings: a user's bookings by start
+        Index('ix_roombookings_stud_start', 'StudID', 'Start'),
+        Index('ix_roombookings_staff_start', 'StaffID', 'Start'),
+        # Calendar feed across all rooms: bookings ending after the window opens
+        Index('ix_roombookings_end_start', 'End', 'Start'),
+        # Admin booking list: newest first, keyset-paginated
+        Index('ix_roombookings_start', 'Start'),
+    )
     
     RBookID = Column(Integer, primary_key=True, autoincrement=True)
     RoomID = Column(Integer, ForeignKey('roomlist.RoomID'), nullable=False)
@@ -37,6 +48,10 @@ class RoomBooking(db.Model):
     Purpose = Column(Text, nullable=False)
     RBookStatus = Column(Enum('Upcoming', 'Ongoing', 'Completed', 'Cancelled', name='booking_status'),
                         default='Upcoming', nullable=False)
+    # Sync cursor for edge clients. Always set from the database clock, like the
+    # column default and MySQL's ON UPDATE, so every writer uses the same zone.
+    UpdatedAt = Column(DateTime, default=func.now(), onupdate=func.now(),
+                       server_default=func.now(), nullable=False)
     
     def __repr__(self):
         return f'<RoomBooking {self.RBookID}: Room {self.RoomID}>'
@@ -45,6 +60,13 @@ class RoomBooking(db.Model):
 class EventBooking(db.Model):
     """Event booking model."""
     __tablename__ = 'eventbookings'
+    __table_args__ = (
+        Index('ix_eventbookings_room_start_end_status', 'RoomID', 'Start', 'End', 'EbookStatus'),
+        Index('ix_eventbookings_stud_start', 'StudID', 'Start'),
+        Index('ix_eventbookings_staff_start', 'StaffID', 'Start'),
+        Index('ix_eventbookings_end_start', 'End', 'Start'),
+        Index('ix_eventbookings_start', 'Start'),
+    )
     
     EBookID = Column(Integer, primary_key=True, autoincrement=True)
     RoomID = Column(Integer, ForeignKey('roomlist.RoomID'), nullable=False)
@@ -60,3 +82,26 @@ class EventBooking(db.Model):
     def __repr__(self):
         return f'<EventBooking {self.EBookID}: Room {self.RoomID}>'
 
+
+class RoomOccupancy(db.Model):
+    """
+    Occupied interval of a room: one row per active (Upcoming/Ongoing) room
+    or event booking, kept in sync when bookings are written.
+    """
+    __tablename__ = 'roomoccupancy'
+    __table_args__ = (
+        # Conflict checks, free slots, calendars and door lookups: one range scan per room
+        Index('ix_roomoccupancy_room_start_end', 'RoomID', 'Start', 'End'),
+        UniqueConstraint('Kind', 'BookingID', name='uq_roomoccupancy_booking'),
+    )
+    
+    OccupancyID = Column(Integer, primary_key=True, autoincrement=True)
+    RoomID = Column(Integer, ForeignKey('roomlist.RoomID'), nullable=False)
+    Kind = Column(Enum('room', 'event', name='booking_kind'), nullable=False)
+    BookingID = Column(Integer, nullable=False)  # RBookID or EBookID
+    Start = Column(DateTime, nullable=False)
+    End = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<RoomOccupancy Room {self.RoomID}: {self.Kind} {self.BookingID}>'
+
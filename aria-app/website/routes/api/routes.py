@@ -1,19 +1,64 @@
 """API route handlers."""
 from flask_restx import Resource, Namespace, fields
-from flask import send_from_directory, current_app
-from datetime import datetime
+from flask import send_from_directory, current_app, request
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import DataError, IntegrityError
 from ...models.user import Student, Staff
 from ...models.room import RoomList, RoomBooking
-from ...models.access import RoomAccessLog
 from ...models.base import db
-from ...services.mail_service import MailService
 from ...services.room_service import RoomService
+from ...services.booking_service import BookingService
+from ...services.access_service import AccessLogService
+from ...app import executor
+from ..bookings import encode_cursor, decode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 
 ns = Namespace("api", description="ARIA API endpoints")
 
+# Rows committed while a sync query runs may carry an UpdatedAt slightly older
+# than the cursor handed back, so cursors overlap by a few seconds.
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+
+# Widest calendar range served; FullCalendar's month view asks for six weeks
+CALENDAR_MAX_RANGE = timedelta(days=62)
+
+# Largest page the paged list endpoints serve
+MAX_PAGE_SIZE = 500
+
+
+def parse_datetime_arg(name: str, required: bool = False):
+    """Parse an ISO 8601 datetime query parameter, aborting with 400 if invalid."""
+    value = request.args.get(name)
+    if not value:
+        if required:
+            ns.abort(400, f"Missing required parameter: {name}")
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        ns.abort(400, f"Invalid datetime for {name}: {value}")
+
+
+def parse_bool_arg(name: str) -> bool:
+    """Parse a boolean query parameter (true/1/yes)."""
+    return request.args.get(name, "").lower() in ("true", "1", "yes")
+
+
+def parse_limit_arg() -> int:
+    """Parse the page size query parameter (None for the default), aborting with 400 if invalid."""
+    limit = request.args.get("limit", type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        ns.abort(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def next_page_headers(cursor) -> dict:
+    """Response headers pointing at the next page (none on the last page)."""
+    return {"X-Next-Cursor": encode_cursor(cursor)} if cursor else {}
+
 # API Models
 student_model = ns.model("Student", {
     "StudID": fields.String(required=True, description="Student ID"),
@@ -51,6 +96,59 @@ room_booking_model = ns.model("RoomBooking", {
     "RBookStatus": fields.String(description="Booking Status")
 })
 
+sync_booking_model = ns.model("SyncBooking", {
+    "BookingID": fields.Integer(attribute="RBookID", description="Booking ID"),
+    "RoomID": fields.Integer(description="Room ID"),
+    "StudID": fields.String(description="Student ID"),
+    "StaffID": fields.String(description="Staff ID"),
+    "Start": fields.DateTime(description="Start Time"),
+    "End": fields.DateTime(description="End Time"),
+    "Status": fields.String(attribute="RBookStatus", description="Booking Status")
+})
+
+sync_user_model = ns.model("SyncUser", {
+    "UserID": fields.String(description="Student or Staff ID"),
+    "UserType": fields.String(description="'student' or 'staff'"),
+    "Name": fields.String(description="User Name")
+})
+
+room_sync_model = ns.model("RoomBookingSync", {
+    "bookings": fields.List(fields.Nested(sync_booking_model),
+                            description="Bookings changed since the cursor"),
+    "active_ids": fields.List(fields.Integer,
+                              description="IDs of all active bookings in the window"),
+    "users": fields.List(fields.Nested(sync_user_model),
+                         description="Users referenced by the changed bookings"),
+    "cursor": fields.DateTime(description="Pass back as updated_since on the next sync")
+})
+
+free_slot_model = ns.model("FreeSlot", {
+    "Start": fields.DateTime(description="Free from"),
+    "End": fields.DateTime(description="Free until")
+})
+
+room_free_slots_model = ns.model("RoomFreeSlots", {
+    "RoomID": fields.Integer(description="Room ID"),
+    "RoomName": fields.String(description="Room Name"),
+    "RoomType": fields.String(description="Room Type"),
+    "FreeSlots": fields.List(fields.Nested(free_slot_model),
+                             description="Free intervals at least the requested duration long")
+})
+
+calendar_booking_model = ns.model("CalendarBooking", {
+    "Type": fields.String(description="'room' or 'event'"),
+    "BookingID": fields.Integer(description="RBookID or EBookID"),
+    "RoomID": fields.Integer(description="Room ID"),
+    "RoomName": fields.String(description="Room Name"),
+    "RoomType": fields.String(description="Room Type"),
+    "StudID": fields.String(description="Student ID"),
+    "StaffID": fields.String(description="Staff ID"),
+    "Start": fields.DateTime(description="Start Time"),
+    "End": fields.DateTime(description="End Time"),
+    "Purpose": fields.String(description="Purpose"),
+    "Status": fields.String(description="Booking Status")
+})
+
 access_log_model = ns.model("AccessLog", {
     "rmaID": fields.Integer(description="Access Log ID"),
     "RoomID": fields.Integer(description="Room ID"),
@@ -68,6 +166,15 @@ access_log_input_model = ns.model("AccessLogInput", {
     "Timestamp": fields.DateTime(description="Timestamp (optional, defaults to now)")
 })
 
+access_log_batch_input_model = ns.model("AccessLogBatchInput", {
+    "events": fields.List(fields.Nested(access_log_input_model), required=True,
+                          description="Access log entries to insert together")
+})
+
+access_log_batch_result_model = ns.model("AccessLogBatchResult", {
+    "created": fields.Integer(description="Number of access log entries created")
+})
+
 
 @ns.route("/studentlist")
 class StudentListAPI(Resource):
@@ -158,12 +265,26 @@ class RBookListAPI(Resource):
     """Get list of all room bookings."""
     
     @ns.marshal_list_with(room_booking_model)
-    @ns.doc(description="Get all room bookings")
+    @ns.doc(description="Get all room bookings, newest first. With include_archived the list is paged: "
+                        "pass the X-Next-Cursor response header back as after for the next page.",
+            params={
+                "include_archived": "Also return bookings moved to the history table (true/false)",
+                "after": "X-Next-Cursor from the previous page (include_archived only)",
+                "limit": f"Page size, at most {MAX_PAGE_SIZE} (include_archived only)"
+            })
     def get(self):
         """Get all room bookings."""
+        include_archived = parse_bool_arg("include_archived")
+        limit = parse_limit_arg()
+        
         try:
-            bookings = db.session.query(RoomBooking).all()
-            return bookings, 200
+            if include_archived:
+                # History grows without bound, so it is only served a page at a time
+                bookings, cursor = BookingService.list_bookings(
+                    'room', after=decode_cursor(request.args.get("after")), limit=limit, include_archived=True
+                )
+                return bookings, 200, next_page_headers(cursor)
+            return BookingService.get_all_room_bookings(), 200
         except Exception as e:
             logger.error(f"Error fetching room bookings: {str(e)}")
             ns.abort(500, "Internal server error")
@@ -187,17 +308,174 @@ class RBookAPI(Resource):
             ns.abort(500, "Internal server error")
 
 
+@ns.route("/rooms/<int:RoomID>/bookings")
+class RoomBookingSyncAPI(Resource):
+    """Incremental booking sync for edge devices."""
+    
+    @ns.marshal_with(room_sync_model)
+    @ns.doc(description="Get a room's bookings in a time window, optionally only those changed since a cursor",
+            params={
+                "start": "Window start (ISO 8601, required)",
+                "end": "Window end (ISO 8601, required)",
+                "updated_since": "Cursor from a previous response (ISO 8601, optional)"
+            })
+    def get(self, RoomID):
+        """Get bookings for a room, filtered by time window and change cursor."""
+        window_start = parse_datetime_arg("start", required=True)
+        window_end = parse_datetime_arg("end", required=True)
+        updated_since = parse_datetime_arg("updated_since")
+        
+        try:
+            # UpdatedAt is written by the database clock, so the cursor is too
+            cursor = db.session.query(func.now()).scalar() - SYNC_CURSOR_OVERLAP
+            bookings = BookingService.get_room_bookings_in_window(
+                RoomID, window_start, window_end, updated_since
+            )
+            active_ids = BookingService.get_active_room_booking_ids(RoomID, window_start, window_end)
+            
+            stud_ids = {b.StudID for b in bookings if b.StudID}
+            staff_ids = {b.StaffID for b in bookings if b.StaffID}
+            users = []
+            if stud_ids:
+                users.extend(
+                    {"UserID": s.StudID, "UserType": "student", "Name": s.StudName}
+                    for s in db.session.query(Student).filter(Student.StudID.in_(stud_ids))
+                )
+            if staff_ids:
+                users.extend(
+                    {"UserID": s.StaffID, "UserType": "staff", "Name": s.StaffName}
+                    for s in db.session.query(Staff).filter(Staff.StaffID.in_(staff_ids))
+                )
+            
+            return {
+                "bookings": bookings,
+                "active_ids": active_ids,
+                "users": users,
+                "cursor": cursor
+            }, 200
+        except Exception as e:
+            logger.error(f"Error syncing bookings for room {RoomID}: {str(e)}")
+            ns.abort(500, "Internal server error")
+
+
+@ns.route("/freeslots")
+class FreeSlotsAPI(Resource):
+    """Free-slot search across rooms."""
+    
+    @ns.marshal_list_with(room_free_slots_model)
+    @ns.doc(description="Find free intervals of at least a given duration in one or more rooms",
+            params={
+                "start": "Search window start (ISO 8601, required)",
+                "end": "Search window end (ISO 8601, required)",
+                "duration": "Minimum free time in minutes (required)",
+                "room_ids": "Comma-separated room IDs (optional, defaults to all rooms)",
+                "room_type": "Only rooms of this type (optional)"
+            })
+    def get(self):
+        """Get each matching room's free intervals in a time window."""
+        window_start = parse_datetime_arg("start", required=True)
+        window_end = parse_datetime_arg("end", required=True)
+        if window_end <= window_start:
+            ns.abort(400, "end must be after start")
+        
+        try:
+            duration = timedelta(minutes=int(request.args.get("duration", "")))
+            room_ids = [int(r) for r in request.args.get("room_ids", "").split(",") if r.strip()]
+        except ValueError:
+            ns.abort(400, "duration and room_ids must be integers")
+        if duration <= timedelta(0):
+            ns.abort(400, "duration must be positive")
+        
+        try:
+            query = db.session.query(RoomList).filter(RoomList.RoomStatus != 'Maintenance')
+            if room_ids:
+                query = query.filter(RoomList.RoomID.in_(room_ids))
+            room_type = request.args.get("room_type")
+            if room_type:
+                query = query.filter(RoomList.RoomType == room_type)
+            rooms = query.order_by(RoomList.RoomName).all()
+            
+            free_slots = BookingService.find_free_slots(
+                [room.RoomID for room in rooms], (window_start, window_end), duration
+            )
+            return [{
+                "RoomID": room.RoomID,
+                "RoomName": room.RoomName,
+                "RoomType": room.RoomType,
+                "FreeSlots": [{"Start": start, "End": end} for start, end in free_slots[room.RoomID]]
+            } for room in rooms if free_slots[room.RoomID]], 200
+        except Exception as e:
+            logger.error(f"Error finding free slots: {str(e)}")
+            ns.abort(500, "Internal server error")
+
+
+@ns.route("/calendar")
+class CalendarAPI(Resource):
+    """Booking calendar feed."""
+    
+    @ns.marshal_list_with(calendar_booking_model)
+    @ns.doc(description="Get the room and event bookings visible in a calendar range",
+            params={
+                "start": "Range start (ISO 8601, required)",
+                "end": "Range end (ISO 8601, required)",
+                "room": "Room ID (optional, defaults to all rooms)",
+                "type": "'room' or 'event' (optional, defaults to both)"
+            })
+    def get(self):
+        """Get bookings overlapping a time range, with room names."""
+        window_start = parse_datetime_arg("start", required=True)
+        window_end = parse_datetime_arg("end", required=True)
+        if window_end <= window_start:
+            ns.abort(400, "end must be after start")
+        if window_end - window_start > CALENDAR_MAX_RANGE:
+            ns.abort(400, f"Range can be at most {CALENDAR_MAX_RANGE.days} days")
+        
+        try:
+            room_id = int(request.args["room"]) if request.args.get("room") else None
+        except ValueError:
+            ns.abort(400, "room must be an integer")
+        kind = request.args.get("type") or None
+        if kind not in (None, "room", "event"):
+            ns.abort(400, "type must be 'room' or 'event'")
+        
+        try:
+            return BookingService.get_calendar_bookings(window_start, window_end, room_id=room_id, kind=kind), 200
+        except Exception as e:
+            logger.error(f"Error getting calendar bookings: {str(e)}")
+            ns.abort(500, "Internal server error")
+
+
 @ns.route("/accesslogs")
 class AccessLogListAPI(Resource):
     """Access log endpoints."""
     
     @ns.marshal_list_with(access_log_model)
-    @ns.doc(description="Get all access logs")
+    @ns.doc(description="Get access logs, newest first",
+            params={
+                "RoomID": "Only this room's entries (optional)",
+                "start": "Only entries at or after this time (ISO 8601, optional)",
+                "end": "Only entries before this time (ISO 8601, optional)",
+                "include_archived": "Also return entries moved to the history table, a page at a time "
+                                    "(true/false; pass the X-Next-Cursor response header back as after)",
+                "after": "X-Next-Cursor from the previous page (include_archived only)",
+                "limit": f"Page size, at most {MAX_PAGE_SIZE} (include_archived only)"
+            })
     def get(self):
-        """Get all access logs."""
+        """Get access logs."""
+        room_id = request.args.get("RoomID", type=int)
+        start = parse_datetime_arg("start")
+        end = parse_datetime_arg("end")
+        include_archived = parse_bool_arg("include_archived")
+        limit = parse_limit_arg()
+        
         try:
-            logs = db.session.query(RoomAccessLog).all()
-            return logs, 200
+            if include_archived:
+                logs, cursor = AccessLogService.list_logs(
+                    room_id=room_id, start=start, end=end, after=decode_cursor(request.args.get("after")),
+                    limit=limit, include_archived=True
+                )
+                return logs, 200, next_page_headers(cursor)
+            return AccessLogService.get_logs(room_id=room_id, start=start, end=end), 200
         except Exception as e:
             logger.error(f"Error fetching access logs: {str(e)}")
             ns.abort(500, "Internal server error")
@@ -209,59 +487,68 @@ class AccessLogListAPI(Resource):
         """Create a new access log entry."""
         try:
             payload = ns.payload
+            access_log = AccessLogService.create_log(payload)
             
-            # Use current timestamp if not provided
-            timestamp = payload.get("Timestamp")
-            if not timestamp:
-                timestamp = datetime.utcnow()
-            
-            # Create access log entry
-            access_log = RoomAccessLog(
-                RoomID=payload["RoomID"],
-                StudID=payload.get("StudID"),
-                StaffID=payload.get("StaffID"),
-                Status=payload["Status"],
-                Timestamp=timestamp
-            )
-            db.session.add(access_log)
-            db.session.commit()
-            
-            # Send notification email
-            room = RoomService.get_by_id(payload["RoomID"])
-            if room:
-                mail_service = MailService(current_app.extensions.get('mail'))
-                
-                if payload.get("StudID"):
-                    user = db.session.query(Student).filter_by(StudID=payload["StudID"]).first()
-                    if user:
-                        mail_service.send_access_notification(
-                            user.StudEmail,
-                            user.StudName,
-                            room.RoomName,
-                            str(timestamp)
-                        )
-                elif payload.get("StaffID"):
-                    user = db.session.query(Staff).filter_by(StaffID=payload["StaffID"]).first()
-                    if user:
-                        mail_service.send_access_notification(
-                            user.StaffEmail,
-                            user.StaffName,
-                            room.RoomName,
-                            str(timestamp)
-                        )
+            # Send notification email off the request path
+            executor.submit(AccessLogService.send_notifications, [{
+                "RoomID": access_log.RoomID,
+                "StudID": access_log.StudID,
+                "StaffID": access_log.StaffID,
+                "Status": access_log.Status,
+                "Timestamp": access_log.Timestamp
+            }])
             
-            logger.info(f"Access log created: {access_log.rmaID}")
             return access_log, 201
             
         except KeyError as e:
             logger.error(f"Missing required field: {str(e)}")
             ns.abort(400, f"Missing required field: {str(e)}")
+        except ValueError as e:
+            logger.error(f"Invalid access log: {str(e)}")
+            ns.abort(400, f"Invalid access log: {str(e)}")
         except Exception as e:
             logger.error(f"Error creating access log: {str(e)}")
             db.session.rollback()
             ns.abort(500, "Internal server error")
 
 
+@ns.route("/accesslogs/batch")
+class AccessLogBatchAPI(Resource):
+    """Bulk access log ingestion for edge device outboxes."""
+    
+    @ns.expect(access_log_batch_input_model)
+    @ns.marshal_with(access_log_batch_result_model, code=201)
+    @ns.doc(description="Create many access log entries in a single transaction")
+    def post(self):
+        """Create many access log entries."""
+        events = (ns.payload or {}).get("events")
+        if not isinstance(events, list):
+            ns.abort(400, "Missing required field: events")
+        
+        try:
+            rows = AccessLogService.create_logs_bulk(events)
+        except KeyError as e:
+            db.session.rollback()
+            logger.error(f"Missing required field in batch: {str(e)}")
+            ns.abort(400, f"Missing required field: {str(e)}")
+        except ValueError as e:
+            db.session.rollback()
+            logger.error(f"Invalid access log in batch: {str(e)}")
+            ns.abort(400, f"Invalid access log: {str(e)}")
+        except (IntegrityError, DataError) as e:
+            # Unknown RoomID/StudID/StaffID or out-of-range values; retrying won't help
+            db.session.rollback()
+            logger.error(f"Rejected access log batch: {str(e.orig)}")
+            ns.abort(400, "Invalid access log: unknown room or user, or invalid value")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error creating access logs in bulk: {str(e)}")
+            ns.abort(500, "Internal server error")
+        
+        executor.submit(AccessLogService.send_notifications, rows)
+        return {"created": len(rows)}, 201
+
+
 @ns.route("/faces")
 class GetFacesFileAPI(Resource):
     """Get face database file."""
@@ -305,3 +592,18 @@ class GetFacesEmbedsFileAPI(Resource):
             logger.error(f"Error serving face embeddings file: {str(e)}")
             ns.abort(500, "Internal server error")
 
+
+
+@ns.route("/facesversion")
+class GetFacesVersionAPI(Resource):
+    """Get the face gallery version."""
+    
+    @ns.doc(description="Get a version tag that changes whenever the face embeddings file is retrained")
+    def get(self):
+        """Get the current face gallery version."""
+        faces_embeds_path = current_app.config.get('FACES_EMBEDDINGS_PATH')
+        if not faces_embeds_path or not faces_embeds_path.exists():
+            ns.abort(404, "Face embeddings file not found")
+        
+        stat = faces_embeds_path.stat()
+        return {"version": f"{stat.st_mtime_ns}-{stat.st_size}"}, 200
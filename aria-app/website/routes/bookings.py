@@ -1,16 +1,16 @@
 """Booking management routes."""
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from sqlalchemy import desc
 from datetime import datetime
-from ..services.booking_service import BookingService
+from typing import Dict, Optional
+from ..services.booking_service import BookingService, PageCursor
 from ..services.room_service import RoomService
 from ..services.mail_service import MailService
+from ..services.timetable_service import TimetableService, FORMATS
 from ..schemas.booking_schema import RoomBookingCreateSchema, EventBookingCreateSchema
 from ..utils.validation import validate_form_data
-from ..models.user import Student, Staff
 from ..models.room import RoomBooking, EventBooking
-from ..models.base import db
 from flask import current_app
 import logging
 
@@ -19,19 +19,72 @@ logger = logging.getLogger(__name__)
 bookings = Blueprint('bookings', __name__)
 
 
-def format_booking_times(bookings_list):
-    """Format booking times for template display."""
-    time_list = []
-    for booking in bookings_list:
-        time_dict = {
-            'ID': booking.RBookID if hasattr(booking, 'RBookID') else booking.EBookID,
-            'StartDate': booking.Start.date().strftime("%Y-%m-%d"),
-            'StartTime': booking.Start.time().strftime("%H:%M:%S"),
-            'EndDate': booking.End.date().strftime("%Y-%m-%d"),
-            'EndTime': booking.End.time().strftime("%H:%M:%S")
-        }
-        time_list.append(time_dict)
-    return time_list
+# Statuses the booking lists can be filtered by
+BOOKING_STATUSES = ('Upcoming', 'Ongoing', 'Completed', 'Cancelled')
+
+
+def encode_cursor(cursor: PageCursor) -> str:
+    """Turn a page cursor into a query parameter value."""
+    return f"{cursor[0].isoformat()}_{cursor[1]}"
+
+
+def decode_cursor(value: Optional[str]) -> Optional[PageCursor]:
+    """Parse a page cursor query parameter (a missing or invalid one means the first page)."""
+    if not value:
+        return None
+    try:
+        start, booking_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(start), int(booking_id)
+    except ValueError:
+        return None
+
+
+def page_url(param: str, cursor: PageCursor = None) -> str:
+    """URL of the current list with one page cursor replaced (or removed, for the first page)."""
+    args = request.args.to_dict()
+    args.pop(param, None)
+    if cursor:
+        args[param] = encode_cursor(cursor)
+    return url_for(request.endpoint, **args)
+
+
+def listing_filters(admin: bool = False) -> Dict:
+    """
+    Read booking list filters from the query string.
+    
+    Filters: room, status, from/to (YYYY-MM-DD) and, for admins, user and
+    archived=1. Invalid values are ignored with a flash message.
+    """
+    filters = {}
+    invalid = []
+    
+    if request.args.get('room'):
+        try:
+            filters['room_id'] = int(request.args['room'])
+        except ValueError:
+            invalid.append('room')
+    for param, key in (('from', 'date_from'), ('to', 'date_to')):
+        if request.args.get(param):
+            try:
+                filters[key] = datetime.strptime(request.args[param], '%Y-%m-%d').date()
+            except ValueError:
+                invalid.append(param)
+    status = request.args.get('status')
+    if status:
+        if status in BOOKING_STATUSES:
+            filters['status'] = status
+        else:
+            invalid.append('status')
+    
+    if admin:
+        if request.args.get('user'):
+            filters['user_id'] = request.args['user'].strip()
+        # archived=1 adds bookings moved to the history tables
+        filters['include_archived'] = request.args.get('archived') == '1'
+    
+    if invalid:
+        flash(f"Ignored invalid filter: {', '.join(invalid)}", category='error')
+    return filters
 
 
 @bookings.route('/MyBookings', methods=['GET', 'POST'])
@@ -43,25 +96,25 @@ def my_bookings():
         return redirect(url_for('home.admin'))
     
     curr_date = datetime.now().strftime("%d-%m-%Y")
+    filters = listing_filters()
     
-    # Get user bookings
+    # Get one page of the user's bookings; room and event bookings page separately
     if current_user.is_Student():
-        room_bookings = BookingService.get_user_room_bookings(current_user.StudID, is_student=True)
-        event_bookings = BookingService.get_user_event_bookings(current_user.StudID, is_student=True)
+        filters['stud_id'] = current_user.StudID
         template = "studBookings.html"
         is_student = True
     else:  # Staff
-        room_bookings = BookingService.get_user_room_bookings(current_user.StaffID, is_student=False)
-        event_bookings = BookingService.get_user_event_bookings(current_user.StaffID, is_student=False)
+        filters['staff_id'] = current_user.StaffID
         template = "staffBookings.html"
         is_student = False
-    
-    room_time_list = format_booking_times(room_bookings)
-    event_time_list = format_booking_times(event_bookings)
+    room_bookings, room_next = BookingService.list_bookings(
+        'room', after=decode_cursor(request.args.get('rafter')), **filters
+    )
+    event_bookings, event_next = BookingService.list_bookings(
+        'event', after=decode_cursor(request.args.get('eafter')), **filters
+    )
     
     rooms = RoomService.get_all()
-    students = db.session.query(Student).all() if is_student else []
-    staff_list = db.session.query(Staff).all() if not is_student else []
     
     from ..services.announcement_service import AnnouncementService
     announcements = AnnouncementService.get_all()
@@ -70,13 +123,14 @@ def my_bookings():
         template,
         user=current_user,
         roomlist=rooms,
-        student=students if is_student else [],
-        staff=staff_list if not is_student else [],
         roombookings=room_bookings,
         eventbookings=event_bookings,
+        rNextPage=page_url('rafter', room_next) if room_next else None,
+        eNextPage=page_url('eafter', event_next) if event_next else None,
+        rFirstPage=page_url('rafter') if request.args.get('rafter') else None,
+        eFirstPage=page_url('eafter') if request.args.get('eafter') else None,
+        bookingStatuses=BOOKING_STATUSES,
         currentDate=curr_date,
-        rBookTimeList=room_time_list,
-        eBookTimeList=event_time_list,
         is_Student=is_student,
         is_Staff=not is_student,
         is_Admin=False,
@@ -176,6 +230,43 @@ def add_event_booking():
             end_time = datetime.strptime(request.form.get('ebooktimeEnd'), '%H:%M:%S').time()
             end = datetime.combine(end_date, end_time)
             
+            # Weekly/biweekly series: book every free date, report the rest
+            repeat_weeks = int(request.form.get('ebookRepeat') or 0)
+            if repeat_weeks:
+                until = datetime.strptime(request.form.get('ebookRepeatUntil', ''), '%Y-%m-%d').date()
+                result = BookingService.create_recurring_event_booking(
+                    room_id=room_id,
+                    stud_id=stud_id,
+                    staff_id=staff_id,
+                    start=start,
+                    end=end,
+                    purpose=purpose,
+                    add_detail=add_detail,
+                    interval_weeks=repeat_weeks,
+                    until=until
+                )
+                if result is None:
+                    flash('Failed to create booking. Please try again.', category='error')
+                    return redirect(url_for('bookings.my_bookings'))
+                
+                created, conflicts = result
+                if created:
+                    room = RoomService.get_by_id(room_id)
+                    if room:
+                        mail_service = MailService(current_app.extensions.get('mail'))
+                        email = current_user.StudEmail if current_user.is_Student() else current_user.StaffEmail
+                        mail_service.send_booking_confirmation(
+                            email,
+                            room.RoomName,
+                            f"{created[0].Start:%Y-%m-%d} to {created[-1].Start:%Y-%m-%d} ({len(created)} dates)"
+                        )
+                    flash(f'Event Booking was Added for {len(created)} of {len(created) + len(conflicts)} dates!',
+                          category='success')
+                if conflicts:
+                    flash('Room already occupied on: ' + ', '.join(f"{slot_start:%Y-%m-%d}" for slot_start, _ in conflicts),
+                          category='error')
+                return redirect(url_for('bookings.my_bookings'))
+            
             # Create booking
             booking = BookingService.create_event_booking(
                 room_id=room_id,
@@ -254,21 +345,19 @@ def manage_room_bookings():
         flash('Only admin allowed on that URL.', category='error')
         return redirect(url_for('home.index'))
     
-    room_bookings = BookingService.get_all_room_bookings()
-    room_time_list = format_booking_times(room_bookings)
-    
+    room_bookings, next_cursor = BookingService.list_bookings(
+        'room', after=decode_cursor(request.args.get('after')), **listing_filters(admin=True)
+    )
     rooms = RoomService.get_all()
-    students = db.session.query(Student).all()
-    staff_list = db.session.query(Staff).all()
     
     return render_template(
         "manageRBookings.html",
         user=current_user,
         roomlist=rooms,
-        staff=staff_list,
-        student=students,
         roombookings=room_bookings,
-        rBookTimeList=room_time_list,
+        nextPage=page_url('after', next_cursor) if next_cursor else None,
+        firstPage=page_url('after') if request.args.get('after') else None,
+        bookingStatuses=BOOKING_STATUSES,
         is_Student=False,
         is_Staff=False,
         is_Admin=True
@@ -283,23 +372,77 @@ def manage_event_bookings():
         flash('Only admin allowed on that URL.', category='error')
         return redirect(url_for('home.index'))
     
-    event_bookings = BookingService.get_all_event_bookings()
-    event_time_list = format_booking_times(event_bookings)
-    
+    event_bookings, next_cursor = BookingService.list_bookings(
+        'event', after=decode_cursor(request.args.get('after')), **listing_filters(admin=True)
+    )
     rooms = RoomService.get_all()
-    students = db.session.query(Student).all()
-    staff_list = db.session.query(Staff).all()
     
     return render_template(
         "manageEBookings.html",
         user=current_user,
         roomlist=rooms,
-        staff=staff_list,
-        student=students,
         eventbookings=event_bookings,
-        eBookTimeList=event_time_list,
+        nextPage=page_url('after', next_cursor) if next_cursor else None,
+        firstPage=page_url('after') if request.args.get('after') else None,
+        bookingStatuses=BOOKING_STATUSES,
         is_Student=False,
         is_Staff=False,
         is_Admin=True
     )
 
+
+@bookings.route('/ImportTimetable', methods=['POST'])
+@login_required
+def import_timetable():
+    """Import room and event bookings from a CSV or JSON Lines timetable (admin only)."""
+    if not current_user.is_Admin():
+        flash('Only admin allowed on that URL.', category='error')
+        return redirect(url_for('home.index'))
+    
+    upload = request.files.get('timetableFile')
+    if not upload or not upload.filename:
+        flash('Please choose a timetable file.', category='error')
+        return redirect(url_for('home.admin'))
+    
+    try:
+        result = TimetableService.import_bookings(upload.stream, upload.filename.rsplit('.', 1)[-1].lower())
+    except ValueError as e:
+        flash(f'Invalid input: {str(e)}', category='error')
+        return redirect(url_for('home.admin'))
+    except Exception as e:
+        logger.error(f"Error importing timetable: {str(e)}")
+        flash('Timetable import failed part-way; bookings before the failure were kept.', category='error')
+        return redirect(url_for('home.admin'))
+    
+    flash(f"Timetable imported: {result['created']} bookings added.", category='success')
+    skipped = sorted(result['errors'] + result['conflicts'])
+    if skipped:
+        details = '; '.join(f"line {line}: {message}" for line, message in skipped[:10])
+        more = f" (and {len(skipped) - 10} more)" if len(skipped) > 10 else ''
+        flash(f"{len(skipped)} rows skipped - {details}{more}", category='error')
+    return redirect(url_for('home.admin'))
+
+
+@bookings.route('/ExportTimetable')
+@login_required
+def export_timetable():
+    """Download active bookings as a CSV or JSON Lines timetable (admin only)."""
+    if not current_user.is_Admin():
+        flash('Only admin allowed on that URL.', category='error')
+        return redirect(url_for('home.index'))
+    
+    fmt = request.args.get('format', 'csv')
+    try:
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+    except ValueError as e:
+        flash(f'Invalid input: {str(e)}', category='error')
+        return redirect(url_for('home.admin'))
+    
+    return Response(
+        stream_with_context(TimetableService.export_bookings(fmt, start, end)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename=timetable.{fmt}'}
+    )
@@ -4,7 +4,6 @@ from flask_login import login_required, current_user
 from datetime import datetime
 from ..models.user import Student, Staff, Admin
 from ..models.announcement import Announcement
-from ..models.room import RoomList, RoomBooking, EventBooking
 from ..models.face import RegisteredFace
 from ..models.base import db
 from ..services.announcement_service import AnnouncementService
@@ -23,8 +22,6 @@ def index():
     rooms = RoomService.get_all()
     students = db.session.query(Student).all()
     staff_list = db.session.query(Staff).all()
-    room_bookings = db.session.query(RoomBooking).all()
-    event_bookings = db.session.query(EventBooking).all()
     
     if current_user.is_authenticated:
         if current_user.is_Staff():
@@ -40,8 +37,6 @@ def index():
         roomlist=rooms,
         staff=staff_list,
         student=students,
-        roombookings=room_bookings,
-        eventbookings=event_bookings,
         announcements=announcements
     )
 
@@ -64,8 +59,6 @@ def student():
     rooms = RoomService.get_all()
     students = db.session.query(Student).all()
     staff_list = db.session.query(Staff).all()
-    room_bookings = db.session.query(RoomBooking).all()
-    event_bookings = db.session.query(EventBooking).all()
     
     reg_face = db.session.query(RegisteredFace).filter_by(StudID=current_user.StudID).first()
     
@@ -75,8 +68,6 @@ def student():
         roomlist=rooms,
         staff=staff_list,
         student=students,
-        roombookings=room_bookings,
-        eventbookings=event_bookings,
         currentDate=curr_date,
         regFaceExist=reg_face,
         announcements=announcements,
@@ -104,8 +95,6 @@ def staff():
     rooms = RoomService.get_all()
     students = db.session.query(Student).all()
     staff_list = db.session.query(Staff).all()
-    room_bookings = db.session.query(RoomBooking).all()
-    event_bookings = db.session.query(EventBooking).all()
     
     reg_face = db.session.query(RegisteredFace).filter_by(StaffID=current_user.StaffID).first()
     
@@ -115,8 +104,6 @@ def staff():
         roomlist=rooms,
         staff=staff_list,
         student=students,
-        roombookings=room_bookings,
-        eventbookings=event_bookings,
         currentDate=curr_date,
         regFaceExist=reg_face,
         announcements=announcements,
@@ -142,8 +129,6 @@ def admin():
     rooms = RoomService.get_all()
     students = db.session.query(Student).all()
     staff_list = db.session.query(Staff).all()
-    room_bookings = db.session.query(RoomBooking).all()
-    event_bookings = db.session.query(EventBooking).all()
     
     return render_template(
         "homeAdmin.html",
@@ -151,8 +136,6 @@ def admin():
         roomlist=rooms,
         staff=staff_list,
         student=students,
-        roombookings=room_bookings,
-        eventbookings=event_bookings,
         is_Student=False,
         is_Staff=False,
         is_Admin=True
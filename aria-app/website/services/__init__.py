@@ -4,6 +4,11 @@ from .announcement_service import AnnouncementService
 from .room_service import RoomService
 from .booking_service import BookingService
 from .mail_service import MailService
+from .access_service import AccessLogService
+from .booking_lifecycle import BookingLifecycle
+from .archival_service import ArchivalService
+from .timetable_service import TimetableService
+from .occupancy_service import OccupancyService
 
 __all__ = [
     'AuthService',
@@ -11,5 +16,10 @@ __all__ = [
     'RoomService',
     'BookingService',
     'MailService',
+    'AccessLogService',
+    'BookingLifecycle',
+    'ArchivalService',
+    'TimetableService',
+    'OccupancyService',
 ]
 
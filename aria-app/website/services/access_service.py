@@ -0,0 +1,198 @@
+"""Access log service."""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, desc, insert, literal, or_, select, union_all
+from sqlalchemy.engine import Row
+from flask import current_app
+from ..models.access import RoomAccessLog
+from ..models.history import RoomAccessLogHistory
+from ..models.room import RoomList
+from ..models.user import Student, Staff
+from ..models.base import db
+from .mail_service import MailService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keyset pagination cursor: (Timestamp, rmaID) of the last entry on a page
+LogCursor = Tuple[datetime, int]
+
+
+class AccessLogService:
+    """Service for room access log operations."""
+    
+    @staticmethod
+    def _to_row(event: Dict) -> Dict:
+        """
+        Convert an access event payload to column values.
+        
+        Raises:
+            KeyError: If RoomID or Status is missing
+            ValueError: If the event is not an object or Timestamp is not ISO 8601
+        """
+        if not isinstance(event, dict):
+            raise ValueError(f"expected an object, got {type(event).__name__}")
+        
+        timestamp = event.get('Timestamp')
+        if not timestamp:
+            timestamp = datetime.utcnow()
+        elif isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        
+        return {
+            'RoomID': event['RoomID'],
+            'StudID': event.get('StudID'),
+            'StaffID': event.get('StaffID'),
+            'Status': event['Status'],
+            'Timestamp': timestamp
+        }
+    
+    @staticmethod
+    def create_log(event: Dict) -> RoomAccessLog:
+        """Create a single access log entry."""
+        access_log = RoomAccessLog(**AccessLogService._to_row(event))
+        db.session.add(access_log)
+        db.session.commit()
+        logger.info(f"Access log created: {access_log.rmaID}")
+        return access_log
+    
+    @staticmethod
+    def create_logs_bulk(events: List[Dict]) -> List[Dict]:
+        """
+        Insert many access log entries in one transaction.
+        
+        Args:
+            events: Access event payloads
+        
+        Returns:
+            The inserted column values, for follow-up notifications
+        """
+        rows = [AccessLogService._to_row(event) for event in events]
+        if rows:
+            db.session.execute(insert(RoomAccessLog), rows)
+            db.session.commit()
+        logger.info(f"Access logs created in bulk: {len(rows)}")
+        return rows
+    
+    @staticmethod
+    def get_logs(room_id: int = None, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> List[RoomAccessLog]:
+        """
+        Get access log entries, newest first.
+        
+        Args:
+            room_id: Only this room's entries (served by the RoomID/Timestamp index)
+            start: Only entries at or after this time
+            end: Only entries before this time
+        """
+        query = db.session.query(RoomAccessLog)
+        if room_id is not None:
+            query = query.filter(RoomAccessLog.RoomID == room_id)
+        if start is not None:
+            query = query.filter(RoomAccessLog.Timestamp >= start)
+        if end is not None:
+            query = query.filter(RoomAccessLog.Timestamp < end)
+        return query.order_by(RoomAccessLog.Timestamp.desc()).all()
+    
+    @staticmethod
+    def list_logs(room_id: int = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  after: LogCursor = None, limit: int = None,
+                  include_archived: bool = False) -> Tuple[List[Row], Optional[LogCursor]]:
+        """
+        Get one page of access log entries, newest first.
+        
+        Pages are keyset-paginated on (Timestamp, rmaID), and live and
+        archived entries are merged in SQL, so a page costs the same however
+        large roomaccesslog_history grows.
+        
+        Args:
+            room_id: Only this room's entries
+            start: Only entries at or after this time
+            end: Only entries before this time
+            after: Cursor returned with the previous page
+            limit: Page size (default ACCESS_LOG_PAGE_SIZE)
+            include_archived: Also read roomaccesslog_history
+        
+        Returns:
+            (rows, cursor for the next page, or None on the last page). Rows have
+            the entry's columns plus Archived.
+        """
+        limit = limit or current_app.config.get('ACCESS_LOG_PAGE_SIZE', 100)
+        models = (RoomAccessLog, RoomAccessLogHistory) if include_archived else (RoomAccessLog,)
+        
+        pages = []
+        for model in models:
+            conditions = []
+            if room_id is not None:
+                conditions.append(model.RoomID == room_id)
+            if start is not None:
+                conditions.append(model.Timestamp >= start)
+            if end is not None:
+                conditions.append(model.Timestamp < end)
+            if after:
+                conditions.append(or_(model.Timestamp < after[0],
+                                      and_(model.Timestamp == after[0], model.rmaID < after[1])))
+            
+            pages.append(
+                select(model.rmaID, model.RoomID, model.StudID, model.StaffID, model.Status, model.Timestamp,
+                       literal(model is RoomAccessLogHistory).label('Archived'))
+                .where(*conditions)
+                .order_by(desc(model.Timestamp), desc(model.rmaID))
+                .limit(limit + 1)
+            )
+        
+        if len(pages) == 1:
+            stmt = pages[0]
+        else:
+            # Each table contributes at most a page; merge them in order
+            merged = union_all(*(select(page.subquery()) for page in pages)).subquery()
+            stmt = select(merged).order_by(desc(merged.c.Timestamp), desc(merged.c.rmaID)).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+        
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].Timestamp, rows[-1].rmaID)
+    
+    @staticmethod
+    def send_notifications(rows: List[Dict]):
+        """
+        Email users about granted access.
+        
+        Meant to run on the executor so requests don't wait on SMTP.
+        
+        Args:
+            rows: Access log column values (RoomID, StudID, StaffID, Status, Timestamp)
+        """
+        granted = [row for row in rows if row.get('Status') == 1]
+        if not granted:
+            return
+        
+        room_ids = {row['RoomID'] for row in granted}
+        stud_ids = {row['StudID'] for row in granted if row.get('StudID')}
+        staff_ids = {row['StaffID'] for row in granted if row.get('StaffID')}
+        
+        rooms = {r.RoomID: r for r in db.session.query(RoomList).filter(RoomList.RoomID.in_(room_ids))}
+        students = {}
+        if stud_ids:
+            students = {s.StudID: s for s in db.session.query(Student).filter(Student.StudID.in_(stud_ids))}
+        staff = {}
+        if staff_ids:
+            staff = {s.StaffID: s for s in db.session.query(Staff).filter(Staff.StaffID.in_(staff_ids))}
+        
+        mail_service = MailService(current_app.extensions.get('mail'))
+        for row in granted:
+            room = rooms.get(row['RoomID'])
+            if not room:
+                continue
+            
+            if row.get('StudID') and row['StudID'] in students:
+                user = students[row['StudID']]
+                mail_service.send_access_notification(
+                    user.StudEmail, user.StudName, room.RoomName, str(row['Timestamp'])
+                )
+            elif row.get('StaffID') and row['StaffID'] in staff:
+                user = staff[row['StaffID']]
+                mail_service.send_access_notification(
+                    user.StaffEmail, user.StaffName, room.RoomName, str(row['Timestamp'])
+                )
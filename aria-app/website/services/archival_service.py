@@ -0,0 +1,77 @@
+"""Archival of old bookings and access logs into history tables."""
+from datetime import datetime, timedelta
+from typing import Dict
+from flask import current_app
+from sqlalchemy import and_, delete, insert, literal, select, DateTime
+from ..models.room import RoomBooking, EventBooking
+from ..models.access import RoomAccessLog
+from ..models.history import RoomBookingHistory, EventBookingHistory, RoomAccessLogHistory
+from ..models.base import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bookings in these statuses can be archived once they're old enough
+ARCHIVED_STATUSES = ('Completed', 'Cancelled')
+
+
+class ArchivalService:
+    """Service for moving old rows into the history tables."""
+    
+    @staticmethod
+    def archive(retention_days: int = None, batch_size: int = None, now: datetime = None) -> Dict[str, int]:
+        """
+        Move finished bookings and access logs older than the retention period
+        into the history tables.
+        
+        Args:
+            retention_days: Keep rows newer than this many days (default ARCHIVE_RETENTION_DAYS)
+            batch_size: Rows moved per transaction (default ARCHIVE_BATCH_SIZE)
+            now: Current time (local, like booking times)
+        
+        Returns:
+            Rows moved per table
+        """
+        if retention_days is None:
+            retention_days = current_app.config.get('ARCHIVE_RETENTION_DAYS', 365)
+        if batch_size is None:
+            batch_size = current_app.config.get('ARCHIVE_BATCH_SIZE', 1000)
+        cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+        
+        moved = {
+            'roombookings': ArchivalService._archive_rows(
+                RoomBooking, RoomBookingHistory, RoomBooking.RBookID,
+                and_(RoomBooking.RBookStatus.in_(ARCHIVED_STATUSES), RoomBooking.End < cutoff), batch_size
+            ),
+            'eventbookings': ArchivalService._archive_rows(
+                EventBooking, EventBookingHistory, EventBooking.EBookID,
+                and_(EventBooking.EbookStatus.in_(ARCHIVED_STATUSES), EventBooking.End < cutoff), batch_size
+            ),
+            'roomaccesslog': ArchivalService._archive_rows(
+                RoomAccessLog, RoomAccessLogHistory, RoomAccessLog.rmaID,
+                RoomAccessLog.Timestamp < cutoff, batch_size
+            ),
+        }
+        logger.info(f"Archived rows older than {cutoff:%Y-%m-%d %H:%M}: {moved}")
+        return moved
+    
+    @staticmethod
+    def _archive_rows(model, history, key, condition, batch_size: int) -> int:
+        """
+        Copy matching rows into history and delete them, one batch per
+        transaction so locks on the live table stay short.
+        """
+        columns = [column.name for column in model.__table__.columns]
+        moved = 0
+        while True:
+            ids = db.session.execute(
+                select(key).where(condition).order_by(key).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return moved
+            
+            rows = select(*model.__table__.columns, literal(datetime.utcnow(), DateTime)).where(key.in_(ids))
+            db.session.execute(insert(history.__table__).from_select(columns + ['ArchivedAt'], rows))
+            db.session.execute(delete(model.__table__).where(key.in_(ids)))
+            db.session.commit()
+            moved += len(ids)
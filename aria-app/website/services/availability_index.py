@@ -0,0 +1,151 @@
+"""In-process availability index for booking conflict checks."""
+import time
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..models.room import RoomBooking, EventBooking, RoomOccupancy
+from ..models.base import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ('room' or 'event', booking ID)
+BookingKey = Tuple[str, int]
+
+# Session.info key collecting rooms whose bookings changed in the transaction
+_CHANGED_ROOMS = 'availability_index_rooms'
+
+
+class _RoomIntervals:
+    """
+    One room's active bookings, sorted by start.
+    
+    Alongside the starts, each prefix keeps the latest end among its
+    bookings, which booking that is, and the latest end among the others.
+    Every booking with Start <= end is a prefix, so a conflict check is one
+    bisect plus a comparison, even when excluding the booking being edited.
+    """
+    
+    __slots__ = ('starts', 'max_end', 'max_key', 'runner_up_end', 'loaded_at')
+    
+    def __init__(self, intervals: List[Tuple[datetime, datetime, BookingKey]]):
+        intervals.sort(key=lambda interval: interval[0])
+        self.starts = [start for start, _, _ in intervals]
+        self.max_end: List[datetime] = []
+        self.max_key: List[BookingKey] = []
+        self.runner_up_end: List[Optional[datetime]] = []
+        self.loaded_at = time.monotonic()
+        
+        best_end, best_key, runner_up = None, None, None
+        for _, end, key in intervals:
+            if best_end is None or end > best_end:
+                runner_up, best_end, best_key = best_end, end, key
+            elif runner_up is None or end > runner_up:
+                runner_up = end
+            self.max_end.append(best_end)
+            self.max_key.append(best_key)
+            self.runner_up_end.append(runner_up)
+    
+    def overlaps(self, start: datetime, end: datetime, exclude: BookingKey = None) -> bool:
+        """Check for a booking with Start <= end and End >= start."""
+        i = bisect_right(self.starts, end)
+        if i == 0:
+            return False
+        latest_end = self.max_end[i - 1]
+        if exclude is not None and self.max_key[i - 1] == exclude:
+            latest_end = self.runner_up_end[i - 1]
+        return latest_end is not None and latest_end >= start
+
+
+class AvailabilityIndex:
+    """
+    Per-room index of active room and event bookings.
+    
+    A room's intervals are loaded on first use and dropped when a
+    transaction that touched its bookings commits, or after
+    AVAILABILITY_INDEX_TTL seconds so changes made by other server
+    processes are picked up.
+    """
+    
+    def __init__(self):
+        self._rooms: Dict[int, _RoomIntervals] = {}
+        self._generations: Dict[int, int] = {}  # bumped on invalidation
+        self._lock = threading.Lock()
+    
+    def is_available(self, room_id: int, start: datetime, end: datetime,
+                     exclude: BookingKey = None) -> bool:
+        """
+        Check a room against both room and event bookings.
+        
+        Args:
+            room_id: Room ID
+            start: Start datetime
+            end: End datetime
+            exclude: Booking to ignore, e.g. ('room', RBookID) when updating it
+        
+        Returns:
+            True if no active booking overlaps the slot
+        """
+        return not self._get(room_id).overlaps(start, end, exclude)
+    
+    def invalidate(self, room_id: int = None):
+        """Drop one room's intervals, or all rooms'."""
+        with self._lock:
+            rooms = list(self._generations) if room_id is None else [room_id]
+            for room in rooms:
+                self._generations[room] = self._generations.get(room, 0) + 1
+                self._rooms.pop(room, None)
+    
+    def _get(self, room_id: int) -> _RoomIntervals:
+        ttl = current_app.config.get('AVAILABILITY_INDEX_TTL', 60)
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            generation = self._generations.setdefault(room_id, 0)
+        if intervals is None or time.monotonic() - intervals.loaded_at > ttl:
+            intervals = self._load(room_id)
+            with self._lock:
+                # A commit during the load may have made these intervals stale
+                if self._generations[room_id] == generation:
+                    self._rooms[room_id] = intervals
+        return intervals
+    
+    @staticmethod
+    def _load(room_id: int) -> _RoomIntervals:
+        """Read a room's active room and event bookings from roomoccupancy."""
+        rows = db.session.query(
+            RoomOccupancy.Kind, RoomOccupancy.BookingID, RoomOccupancy.Start, RoomOccupancy.End
+        ).filter(RoomOccupancy.RoomID == room_id).all()
+        
+        intervals = [(start, end, (kind, booking_id)) for kind, booking_id, start, end in rows]
+        logger.debug(f"Availability index loaded for room {room_id}: {len(intervals)} bookings")
+        return _RoomIntervals(intervals)
+
+
+# Process-wide index
+availability_index = AvailabilityIndex()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_rooms(session, flush_context):
+    """Remember rooms whose bookings this flush wrote, including a booking's previous room."""
+    rooms = session.info.setdefault(_CHANGED_ROOMS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (RoomBooking, EventBooking)):
+            history = inspect(obj).attrs.RoomID.history
+            rooms.update(r for r in chain(history.added, history.unchanged, history.deleted) if r is not None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_rooms(session):
+    for room_id in session.info.pop(_CHANGED_ROOMS, ()):
+        availability_index.invalidate(room_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_rooms(session):
+    session.info.pop(_CHANGED_ROOMS, None)
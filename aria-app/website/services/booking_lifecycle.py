@@ -0,0 +1,122 @@
+"""Booking status lifecycle: Upcoming -> Ongoing -> Completed."""
+import threading
+from datetime import datetime
+from typing import Dict
+from flask import Flask
+from sqlalchemy import and_, delete, select, update
+from ..models.room import RoomBooking, EventBooking, RoomOccupancy
+from ..models.base import db
+from .availability_index import availability_index
+from .occupancy_service import ACTIVE_STATUSES
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BookingLifecycle:
+    """Moves room and event bookings through their statuses in bulk."""
+    
+    @staticmethod
+    def update_statuses(now: datetime = None) -> Dict[str, int]:
+        """
+        Complete bookings that have ended and start those under way.
+        
+        One UPDATE per table and transition, so the cost doesn't depend on
+        how many bookings change. Cancelled bookings are left alone.
+        
+        Args:
+            now: Current time (local, like booking times)
+        
+        Returns:
+            Bookings changed per transition: {'completed': n, 'started': n}
+        """
+        now = now or datetime.now()
+        counts = {'completed': 0, 'started': 0}
+        ended_rooms = set(db.session.execute(
+            select(RoomOccupancy.RoomID).where(RoomOccupancy.End < now).distinct()
+        ).scalars())
+        
+        for model, status in ((RoomBooking, RoomBooking.RBookStatus), (EventBooking, EventBooking.EbookStatus)):
+            ended = and_(status.in_(ACTIVE_STATUSES), model.End < now)
+            counts['completed'] += db.session.execute(
+                update(model).where(ended).values({status: 'Completed'}),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            counts['started'] += db.session.execute(
+                update(model).where(status == 'Upcoming', model.Start <= now).values({status: 'Ongoing'}),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+        # Completed bookings no longer hold their rooms; starting ones still do
+        db.session.execute(delete(RoomOccupancy).where(RoomOccupancy.End < now))
+        db.session.commit()
+        
+        # Bulk UPDATEs bypass the session's flush events, so drop the rooms here
+        for room_id in ended_rooms:
+            availability_index.invalidate(room_id)
+        
+        if counts['completed'] or counts['started']:
+            logger.info(f"Booking statuses updated: {counts['started']} started, "
+                        f"{counts['completed']} completed")
+        return counts
+
+
+class BookingLifecycleScheduler:
+    """
+    Runs BookingLifecycle.update_statuses every interval seconds on a
+    daemon thread.
+    
+    Each server process runs its own; the updates are idempotent, so
+    overlapping passes from several processes are harmless. Passes are
+    skipped until the schema is migrated.
+    """
+    
+    def __init__(self, app: Flask, interval: float):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._schema_current = False
+        self._warned_pending = False
+    
+    def start(self):
+        """Start the scheduler thread (first pass after one interval)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='booking-lifecycle', daemon=True)
+            self._thread.start()
+        logger.info(f"Booking lifecycle scheduler started (every {self.interval}s)")
+    
+    def stop(self):
+        """Stop the scheduler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    if self._schema_ready():
+                        BookingLifecycle.update_statuses()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error updating booking statuses: {str(e)}")
+    
+    def _schema_ready(self) -> bool:
+        """Check that migrations are applied (the updates need roomoccupancy)."""
+        if self._schema_current:
+            return True
+        from ..migrations.cli import get_runner
+        
+        if get_runner().pending():
+            if not self._warned_pending:
+                logger.warning("Booking lifecycle paused: migrations are pending; run `flask schema upgrade`")
+                self._warned_pending = True
+            return False
+        self._schema_current = True
+        return True
@@ -1,13 +1,72 @@
 """Booking service."""
-from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy import and_, desc
-from ..models.room import RoomBooking, EventBooking
+import time
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, desc, func, literal, or_, select, text, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import OperationalError
+from ..models.user import Student, Staff
+from ..models.room import RoomList, RoomBooking, EventBooking, RoomOccupancy
+from ..models.history import RoomBookingHistory, EventBookingHistory
 from ..models.base import db
+from .availability_index import availability_index
+from .occupancy_service import OccupancyService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# MySQL lock wait timeout and deadlock error codes
+LOCK_ERROR_CODES = (1205, 1213)
+
+# Longest series a recurring booking may create
+MAX_OCCURRENCES = 52
+
+# Bookings that touch count as overlapping, so free slots keep this clear of
+# neighbouring bookings (booking times are entered to the minute)
+SLOT_GAP = timedelta(minutes=1)
+
+T = TypeVar('T')
+
+# Keyset pagination cursor: (Start, booking ID) of the last row on a page
+PageCursor = Tuple[datetime, int]
+
+
+def is_lock_error(error: OperationalError) -> bool:
+    """Check whether a database error means a lock could not be taken (safe to retry)."""
+    orig = getattr(error, 'orig', None)
+    code = orig.args[0] if orig is not None and orig.args else None
+    return code in LOCK_ERROR_CODES or 'database is locked' in str(error)
+
+
+def find_overlaps(booked: List[Tuple[datetime, datetime]], slots: List[Tuple[datetime, datetime]]) -> np.ndarray:
+    """
+    Check many slots against existing bookings at once.
+    
+    Bookings are sorted by start with a running maximum of their ends; the
+    bookings starting no later than a slot's end are a prefix (found with
+    searchsorted), and the slot overlaps one iff that prefix's latest end
+    reaches the slot's start. Touching intervals overlap, as in the
+    single-booking checks.
+    
+    Returns:
+        Boolean array, True where slots[i] overlaps a booking
+    """
+    slot_starts = np.array([start for start, _ in slots], dtype='datetime64[us]')
+    slot_ends = np.array([end for _, end in slots], dtype='datetime64[us]')
+    if not booked:
+        return np.zeros(len(slots), dtype=bool)
+    
+    booked = sorted(booked)
+    starts = np.array([start for start, _ in booked], dtype='datetime64[us]')
+    latest_end = np.maximum.accumulate(np.array([end for _, end in booked], dtype='datetime64[us]'))
+    
+    prefix = np.searchsorted(starts, slot_ends, side='right')
+    return (prefix > 0) & (latest_end[np.maximum(prefix - 1, 0)] >= slot_starts)
+
 
 class BookingService:
     """Service for booking operations."""
@@ -18,48 +77,26 @@ class BookingService:
         """
         Check if a room is available for the given time slot.
         
+        Both room and event bookings hold the room, so either conflicts.
+        
         Args:
             room_id: Room ID
             start: Start datetime
             end: End datetime
-            exclude_booking_id: Booking ID to exclude from check (for updates)
+            exclude_booking_id: Room booking ID to exclude from check (for updates)
             
         Returns:
             True if available, False if conflicting bookings exist
         """
-        query = db.session.query(RoomBooking).filter(
-            and_(
-                RoomBooking.RoomID == room_id,
-                RoomBooking.Start <= end,
-                RoomBooking.End >= start,
-                RoomBooking.RBookStatus.in_(['Upcoming', 'Ongoing'])
-            )
-        )
-        
-        if exclude_booking_id:
-            query = query.filter(RoomBooking.RBookID != exclude_booking_id)
-        
-        conflicting = query.first()
-        return conflicting is None
+        exclude = ('room', exclude_booking_id) if exclude_booking_id else None
+        return availability_index.is_available(room_id, start, end, exclude)
     
     @staticmethod
     def check_event_availability(room_id: int, start: datetime, end: datetime,
                                 exclude_booking_id: int = None) -> bool:
-        """Check if a room is available for event booking."""
-        query = db.session.query(EventBooking).filter(
-            and_(
-                EventBooking.RoomID == room_id,
-                EventBooking.Start <= end,
-                EventBooking.End >= start,
-                EventBooking.EbookStatus.in_(['Upcoming', 'Ongoing'])
-            )
-        )
-        
-        if exclude_booking_id:
-            query = query.filter(EventBooking.EBookID != exclude_booking_id)
-        
-        conflicting = query.first()
-        return conflicting is None
+        """Check if a room is available for event booking (against room and event bookings)."""
+        exclude = ('event', exclude_booking_id) if exclude_booking_id else None
+        return availability_index.is_available(room_id, start, end, exclude)
     
     @staticmethod
     def validate_booking_duration(start: datetime, end: datetime, max_hours: int = 2) -> tuple[bool, str]:
@@ -91,12 +128,12 @@ class BookingService:
             logger.warning(f"Invalid booking duration: {error_msg}")
             return None
         
-        # Check availability
+        # Check availability (fast rejection before taking the room lock)
         if not BookingService.check_room_availability(room_id, start, end):
             logger.warning(f"Room {room_id} not available for {start} - {end}")
             return None
         
-        booking = RoomBooking(
+        booking = BookingService._insert_booking(room_id, start, end, lambda: RoomBooking(
             RoomID=room_id,
             StudID=stud_id,
             StaffID=staff_id,
@@ -104,10 +141,9 @@ class BookingService:
             End=end,
             Purpose=purpose,
             RBookStatus='Upcoming'
-        )
-        db.session.add(booking)
-        db.session.commit()
-        logger.info(f"Room booking created: {booking.RBookID}")
+        ))
+        if booking:
+            logger.info(f"Room booking created: {booking.RBookID}")
         return booking
     
     @staticmethod
@@ -119,12 +155,12 @@ class BookingService:
             logger.warning("Invalid booking time")
             return None
         
-        # Check availability
+        # Check availability (fast rejection before taking the room lock)
         if not BookingService.check_event_availability(room_id, start, end):
             logger.warning(f"Room {room_id} not available for event {start} - {end}")
             return None
         
-        booking = EventBooking(
+        booking = BookingService._insert_booking(room_id, start, end, lambda: EventBooking(
             RoomID=room_id,
             StudID=stud_id,
             StaffID=staff_id,
@@ -133,12 +169,194 @@ class BookingService:
             Purpose=purpose,
             AddDetail=add_detail,
             EbookStatus='Upcoming'
-        )
-        db.session.add(booking)
-        db.session.commit()
-        logger.info(f"Event booking created: {booking.EBookID}")
+        ))
+        if booking:
+            logger.info(f"Event booking created: {booking.EBookID}")
         return booking
     
+    @staticmethod
+    def recurrence_slots(start: datetime, end: datetime, interval_weeks: int,
+                         until: date) -> List[Tuple[datetime, datetime]]:
+        """
+        Expand a booking into a weekly series.
+        
+        Args:
+            start: First occurrence start
+            end: First occurrence end
+            interval_weeks: Weeks between occurrences (1 = weekly, 2 = biweekly)
+            until: Last date an occurrence may start on
+        
+        Raises:
+            ValueError: If the times, interval or series length are invalid
+        """
+        step = timedelta(weeks=interval_weeks)
+        if end < start:
+            raise ValueError("Booking time invalid")
+        if interval_weeks < 1 or end - start >= step:
+            raise ValueError("Occurrences must not overlap each other")
+        if until < start.date():
+            raise ValueError("Repeat end date is before the first booking")
+        
+        count = (until - start.date()).days // step.days + 1
+        if count > MAX_OCCURRENCES:
+            raise ValueError(f"A series can have at most {MAX_OCCURRENCES} occurrences")
+        return [(start + i * step, end + i * step) for i in range(count)]
+    
+    @staticmethod
+    def create_recurring_event_booking(room_id: int, stud_id: str = None, staff_id: str = None,
+                                       start: datetime = None, end: datetime = None,
+                                       purpose: str = None, add_detail: str = None,
+                                       interval_weeks: int = 1, until: date = None
+                                       ) -> Optional[Tuple[List[EventBooking], List[Tuple[datetime, datetime]]]]:
+        """
+        Create a weekly or biweekly series of event bookings.
+        
+        Occurrences that clash with existing room or event bookings are
+        skipped rather than failing the series. Under the room lock, room
+        occupancy is read once for the series' whole range, every
+        occurrence is checked in one vectorized pass, and the free ones are
+        inserted in a single transaction.
+        
+        Returns:
+            (created bookings, conflicting (start, end) slots), or None if the
+            room is missing or its lock could not be taken
+        
+        Raises:
+            ValueError: If the series is invalid (see recurrence_slots)
+        """
+        slots = BookingService.recurrence_slots(start, end, interval_weeks, until)
+        
+        def insert_series():
+            booked = [(s, e) for _, _, _, s, e in OccupancyService.overlapping([room_id], slots[0][0], slots[-1][1])]
+            clashes = find_overlaps(booked, slots)
+            created = [EventBooking(
+                RoomID=room_id,
+                StudID=stud_id,
+                StaffID=staff_id,
+                Start=slot_start,
+                End=slot_end,
+                Purpose=purpose,
+                AddDetail=add_detail,
+                EbookStatus='Upcoming'
+            ) for (slot_start, slot_end), clash in zip(slots, clashes) if not clash]
+            db.session.add_all(created)
+            return created, [slot for slot, clash in zip(slots, clashes) if clash]
+        
+        result = BookingService._run_locked(room_id, insert_series)
+        if result:
+            logger.info(f"Recurring event booking in room {room_id}: {len(result[0])} created, "
+                        f"{len(result[1])} conflicting")
+        return result
+    
+    @staticmethod
+    def _insert_booking(room_id: int, start: datetime, end: datetime,
+                        make_booking: Callable[[], Union[RoomBooking, EventBooking]]
+                        ) -> Optional[Union[RoomBooking, EventBooking]]:
+        """
+        Insert a booking if its slot is still free, serialised per room.
+        
+        Under the room lock the slot is re-checked against the database
+        rather than the in-process index, which may lag other server
+        processes.
+        
+        Returns:
+            The committed booking, or None if the room is missing, the slot
+            was taken meanwhile, or the lock could not be taken
+        """
+        def insert():
+            if BookingService._has_conflict(room_id, start, end):
+                logger.warning(f"Room {room_id} was booked for {start} - {end} by a concurrent request")
+                return None
+            booking = make_booking()
+            db.session.add(booking)
+            return booking
+        
+        return BookingService._run_locked(room_id, insert)
+    
+    @staticmethod
+    def _run_locked(room_id: int, work: Callable[[], Optional[T]]) -> Optional[T]:
+        """
+        Run work() with the room locked and commit what it added.
+        
+        The roomlist row is locked with SELECT ... FOR UPDATE, so concurrent
+        bookings for one room take turns while other rooms proceed. Lock
+        timeouts and deadlocks are retried with jittered backoff.
+        
+        The transaction the request is already in (the user loader and the
+        availability index read the database) is committed first: under
+        InnoDB's REPEATABLE READ its snapshot would hide bookings committed
+        while this one waited for the lock, so work() must read in a
+        transaction whose snapshot is taken after the lock.
+        
+        Returns:
+            work()'s result, or None if the room is missing, the lock could
+            not be taken, or work() returned None (its changes are rolled back)
+        """
+        db.session.commit()
+        retries = current_app.config.get('BOOKING_LOCK_RETRIES', 3)
+        for attempt in range(retries + 1):
+            try:
+                if BookingService._lock_room(room_id) is None:
+                    db.session.rollback()
+                    logger.warning(f"Room {room_id} not found")
+                    return None
+                
+                result = work()
+                if result is None:
+                    db.session.rollback()
+                    return None
+                db.session.commit()
+                return result
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_lock_error(e):
+                    raise
+                if attempt == retries:
+                    logger.error(f"Gave up booking room {room_id} after {attempt + 1} lock failures: {str(e)}")
+                    return None
+                delay = random.uniform(0, current_app.config.get('BOOKING_LOCK_RETRY_SECONDS', 0.05) * 2 ** attempt)
+                logger.warning(f"Lock contention booking room {room_id}; retrying in {delay * 1000:.0f} ms")
+                time.sleep(delay)
+    
+    @staticmethod
+    def _lock_room(room_id: int) -> Optional[int]:
+        """
+        Lock a room's roomlist row for the rest of the transaction.
+        
+        Call at the start of a transaction, before any plain reads: on MySQL
+        a read made earlier in the transaction fixes the snapshot later
+        reads see, including bookings committed while waiting for the lock.
+        """
+        query = db.session.query(RoomList.RoomID).filter_by(RoomID=room_id).with_for_update()
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'mysql':
+            # Fail fast instead of InnoDB's 50 s default; the caller retries. The
+            # setting is per connection, so put it back before the pool reuses it.
+            db.session.execute(text("SET @booking_lock_wait_timeout = @@innodb_lock_wait_timeout, "
+                                    "innodb_lock_wait_timeout = :timeout"),
+                               {'timeout': current_app.config.get('BOOKING_LOCK_TIMEOUT', 5)})
+            try:
+                return query.scalar()
+            finally:
+                db.session.execute(text("SET innodb_lock_wait_timeout = @booking_lock_wait_timeout"))
+        if dialect == 'sqlite':
+            # SQLite ignores FOR UPDATE; a no-op write takes its database write lock instead
+            db.session.execute(text("UPDATE roomlist SET RoomID = RoomID WHERE RoomID = :room_id"),
+                               {'room_id': room_id})
+        return query.scalar()
+    
+    @staticmethod
+    def _has_conflict(room_id: int, start: datetime, end: datetime) -> bool:
+        """Check the database for an active room or event booking overlapping a slot."""
+        conflict = db.session.query(RoomOccupancy.OccupancyID).filter(
+            and_(
+                RoomOccupancy.RoomID == room_id,
+                RoomOccupancy.Start <= end,
+                RoomOccupancy.End >= start
+            )
+        ).first()
+        return conflict is not None
+    
     @staticmethod
     def get_user_room_bookings(user_id: str, is_student: bool = True) -> List[RoomBooking]:
         """Get room bookings for a user."""
@@ -155,6 +373,120 @@ class BookingService:
         else:
             return db.session.query(EventBooking).filter_by(StaffID=user_id).order_by(desc(EventBooking.Start)).all()
     
+    @staticmethod
+    def get_calendar_bookings(window_start: datetime, window_end: datetime, room_id: int = None,
+                              kind: str = None) -> List[Dict]:
+        """
+        Get room and event bookings overlapping a calendar's visible range.
+        
+        Bookings of every status are returned so past and cancelled ones
+        still show on the calendar.
+        
+        Args:
+            window_start: Start of the visible range
+            window_end: End of the visible range
+            room_id: Only this room's bookings
+            kind: Only 'room' or 'event' bookings
+        
+        Returns:
+            Bookings with their room's name and type, ordered by start time
+        """
+        bookings = []
+        for booking_kind, model, key, status in (
+                ('room', RoomBooking, RoomBooking.RBookID, RoomBooking.RBookStatus),
+                ('event', EventBooking, EventBooking.EBookID, EventBooking.EbookStatus)):
+            if kind and kind != booking_kind:
+                continue
+            
+            query = db.session.query(
+                key.label('BookingID'), model.RoomID, RoomList.RoomName, RoomList.RoomType, model.StudID,
+                model.StaffID, model.Start, model.End, model.Purpose, status.label('Status')
+            ).join(RoomList, RoomList.RoomID == model.RoomID).filter(
+                and_(
+                    model.Start <= window_end,
+                    model.End >= window_start
+                )
+            )
+            if room_id is not None:
+                query = query.filter(model.RoomID == room_id)
+            
+            bookings += [dict(row._mapping, Type=booking_kind) for row in query]
+        return sorted(bookings, key=lambda booking: booking['Start'])
+    
+    @staticmethod
+    def get_room_bookings_in_window(room_id: int, window_start: datetime, window_end: datetime,
+                                    updated_since: datetime = None) -> List[RoomBooking]:
+        """
+        Get a room's bookings overlapping a time window.
+        
+        Args:
+            room_id: Room ID
+            window_start: Start of the window
+            window_end: End of the window
+            updated_since: Only return bookings modified after this time (sync cursor)
+        
+        Returns:
+            Bookings ordered by start time, including cancelled ones so clients can drop them
+        """
+        query = db.session.query(RoomBooking).filter(
+            and_(
+                RoomBooking.RoomID == room_id,
+                RoomBooking.Start <= window_end,
+                RoomBooking.End >= window_start
+            )
+        )
+        
+        if updated_since:
+            query = query.filter(RoomBooking.UpdatedAt > updated_since)
+        
+        return query.order_by(RoomBooking.Start).all()
+    
+    @staticmethod
+    def get_active_room_booking_ids(room_id: int, window_start: datetime, window_end: datetime) -> List[int]:
+        """Get IDs of a room's active bookings overlapping a time window."""
+        rows = OccupancyService.overlapping([room_id], window_start, window_end, kind='room')
+        return [booking_id for _, _, booking_id, _, _ in rows]
+    
+    @staticmethod
+    def find_free_slots(room_ids: List[int], date_range: Tuple[datetime, datetime],
+                        duration: timedelta) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """
+        Find free intervals long enough for a booking in several rooms.
+        
+        Room and event bookings overlapping the range are read from room
+        occupancy with one indexed range query for all rooms, then each room's
+        bookings are swept in start order, merging overlaps and emitting
+        the gaps between them. Like the conflict checks, a slot may not
+        touch a booking, so each slot starts SLOT_GAP after the booking
+        before it and ends SLOT_GAP before the next one.
+        
+        Args:
+            room_ids: Rooms to search
+            date_range: (start, end) of the search window
+            duration: Minimum free interval length
+        
+        Returns:
+            Room ID -> free (start, end) intervals within the window, in order
+        """
+        window_start, window_end = date_range
+        busy = defaultdict(list)
+        if room_ids:
+            for room_id, _, _, start, end in OccupancyService.overlapping(room_ids, window_start, window_end):
+                busy[room_id].append((start, end))
+        
+        free_slots = {}
+        for room_id in room_ids:
+            slots = []
+            free_from = window_start
+            for start, end in sorted(busy[room_id]):
+                if start - SLOT_GAP - free_from >= duration:
+                    slots.append((free_from, start - SLOT_GAP))
+                free_from = max(free_from, end + SLOT_GAP)
+            if window_end - free_from >= duration:
+                slots.append((free_from, window_end))
+            free_slots[room_id] = slots
+        return free_slots
+    
     @staticmethod
     def get_all_room_bookings() -> List[RoomBooking]:
         """Get all room bookings."""
@@ -165,6 +497,94 @@ class BookingService:
         """Get all event bookings."""
         return db.session.query(EventBooking).order_by(desc(EventBooking.Start)).all()
     
+    @staticmethod
+    def list_bookings(kind: str, room_id: int = None, user_id: str = None, stud_id: str = None,
+                      staff_id: str = None, status: str = None, date_from: date = None, date_to: date = None,
+                      after: PageCursor = None, limit: int = None,
+                      include_archived: bool = False) -> Tuple[List[Row], Optional[PageCursor]]:
+        """
+        Get one page of room or event bookings, newest first, with room and user names.
+        
+        Pages are keyset-paginated on (Start, booking ID): each page begins
+        after the previous page's last row, so a deep page costs the same
+        as the first and is read through the Start-ordered indexes.
+        
+        Args:
+            kind: 'room' or 'event'
+            room_id: Only this room
+            user_id: Only this student or staff member
+            stud_id: Only this student
+            staff_id: Only this staff member
+            status: Only this booking status
+            date_from: Only bookings ending on or after this day
+            date_to: Only bookings starting on or before this day
+            after: Cursor returned with the previous page
+            limit: Page size (default BOOKING_PAGE_SIZE)
+            include_archived: Also list bookings moved to the history table
+        
+        Returns:
+            (rows, cursor for the next page, or None on the last page). Rows have
+            the booking's columns plus RoomName, UserName and Archived.
+        """
+        limit = limit or current_app.config.get('BOOKING_PAGE_SIZE', 50)
+        if kind == 'room':
+            id_name, status_name, models = 'RBookID', 'RBookStatus', [RoomBooking, RoomBookingHistory]
+        else:
+            id_name, status_name, models = 'EBookID', 'EbookStatus', [EventBooking, EventBookingHistory]
+        if not include_archived:
+            models = models[:1]
+        
+        pages = []
+        for model in models:
+            key, booking_status = getattr(model, id_name), getattr(model, status_name)
+            columns = [key, model.RoomID, RoomList.RoomName, model.StudID, model.StaffID,
+                       func.coalesce(Student.StudName, Staff.StaffName).label('UserName'),
+                       model.Start, model.End, model.Purpose]
+            if kind == 'event':
+                columns.append(model.AddDetail)
+            columns += [booking_status, literal(model in (RoomBookingHistory, EventBookingHistory)).label('Archived')]
+            
+            conditions = []
+            if room_id is not None:
+                conditions.append(model.RoomID == room_id)
+            if user_id is not None:
+                conditions.append(or_(model.StudID == user_id, model.StaffID == user_id))
+            if stud_id is not None:
+                conditions.append(model.StudID == stud_id)
+            if staff_id is not None:
+                conditions.append(model.StaffID == staff_id)
+            if status:
+                conditions.append(booking_status == status)
+            if date_from:
+                conditions.append(model.End >= datetime.combine(date_from, datetime.min.time()))
+            if date_to:
+                conditions.append(model.Start < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+            if after:
+                conditions.append(or_(model.Start < after[0], and_(model.Start == after[0], key < after[1])))
+            
+            pages.append(
+                select(*columns)
+                .outerjoin(RoomList, RoomList.RoomID == model.RoomID)
+                .outerjoin(Student, Student.StudID == model.StudID)
+                .outerjoin(Staff, Staff.StaffID == model.StaffID)
+                .where(*conditions)
+                .order_by(desc(model.Start), desc(key))
+                .limit(limit + 1)
+            )
+        
+        if len(pages) == 1:
+            stmt = pages[0]
+        else:
+            # Each table contributes at most a page; merge them in order
+            merged = union_all(*(select(page.subquery()) for page in pages)).subquery()
+            stmt = select(merged).order_by(desc(merged.c.Start), desc(merged.c[id_name])).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+        
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].Start, getattr(rows[-1], id_name))
+    
     @staticmethod
     def delete_room_booking(booking_id: int) -> bool:
         """Delete a room booking."""
@@ -0,0 +1,143 @@
+"""Room occupancy projection of room and event bookings."""
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import and_, delete, event, func, insert, literal, select
+from ..models.room import RoomBooking, EventBooking, RoomOccupancy
+from ..models.base import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Booking statuses that hold a room
+ACTIVE_STATUSES = ('Upcoming', 'Ongoing')
+
+_occupancy = RoomOccupancy.__table__
+
+# (kind, model, ID column, status column)
+_BOOKING_TABLES = (
+    ('room', RoomBooking, RoomBooking.RBookID, RoomBooking.RBookStatus),
+    ('event', EventBooking, EventBooking.EBookID, EventBooking.EbookStatus),
+)
+
+
+class OccupancyService:
+    """
+    Service for the roomoccupancy table.
+    
+    Room and event bookings are projected into one table with a row per
+    active booking, so every "is this room taken" question is a single
+    range query on (RoomID, Start, End). ORM writes keep it in sync through
+    mapper events in the same transaction; bulk statements that bypass the
+    ORM call rebuild() for the rooms they touched, or project_inserted()
+    after bulk inserts.
+    """
+    
+    @staticmethod
+    def overlapping(room_ids: List[int], start: datetime, end: datetime,
+                    kind: str = None) -> List[Tuple[int, str, int, datetime, datetime]]:
+        """
+        Get occupied intervals overlapping a time range (touching counts).
+        
+        Args:
+            room_ids: Rooms to look at
+            start: Range start
+            end: Range end
+            kind: Only 'room' or 'event' bookings
+        
+        Returns:
+            (RoomID, Kind, BookingID, Start, End) rows
+        """
+        query = db.session.query(
+            RoomOccupancy.RoomID, RoomOccupancy.Kind, RoomOccupancy.BookingID,
+            RoomOccupancy.Start, RoomOccupancy.End
+        ).filter(
+            and_(
+                RoomOccupancy.RoomID.in_(room_ids),
+                RoomOccupancy.Start <= end,
+                RoomOccupancy.End >= start
+            )
+        )
+        if kind:
+            query = query.filter(RoomOccupancy.Kind == kind)
+        return query.all()
+    
+    @staticmethod
+    def rebuild(room_ids: List[int] = None, bind=None):
+        """
+        Re-project active bookings into roomoccupancy, for some rooms or all.
+        
+        For writes that skip mapper events (bulk INSERT/UPDATE/DELETE). Runs
+        in the caller's transaction; the caller commits.
+        
+        Args:
+            room_ids: Rooms to rebuild (default: all)
+            bind: Session or connection to run on (default: db.session)
+        """
+        bind = bind if bind is not None else db.session
+        clear = delete(_occupancy)
+        if room_ids is not None:
+            clear = clear.where(_occupancy.c.RoomID.in_(room_ids))
+        bind.execute(clear)
+        
+        for kind, model, key, status in _BOOKING_TABLES:
+            rows = select(model.RoomID, literal(kind), key, model.Start, model.End).where(status.in_(ACTIVE_STATUSES))
+            if room_ids is not None:
+                rows = rows.where(model.RoomID.in_(room_ids))
+            bind.execute(insert(_occupancy).from_select(['RoomID', 'Kind', 'BookingID', 'Start', 'End'], rows))
+    
+    @staticmethod
+    def last_booking_id(model) -> int:
+        """Highest room or event booking ID so far (0 if none), to pass to project_inserted()."""
+        _, _, key, _ = next(entry for entry in _BOOKING_TABLES if entry[1] is model)
+        return db.session.query(func.max(key)).scalar() or 0
+    
+    @staticmethod
+    def project_inserted(model, room_ids: List[int], after_id: int):
+        """
+        Project bookings just bulk-inserted into some rooms into roomoccupancy.
+        
+        Only rows with IDs above after_id (from last_booking_id() before the
+        insert) are read, so the cost is the new rows, not the rooms' whole
+        schedules. The caller must hold the rooms' locks, so no other booking
+        in them can be inserted meanwhile. Runs in the caller's transaction.
+        
+        Args:
+            model: RoomBooking or EventBooking
+            room_ids: Rooms the rows were inserted into
+            after_id: Highest ID before the insert
+        """
+        kind, _, key, status = next(entry for entry in _BOOKING_TABLES if entry[1] is model)
+        rows = select(model.RoomID, literal(kind), key, model.Start, model.End).where(
+            key > after_id, model.RoomID.in_(room_ids), status.in_(ACTIVE_STATUSES)
+        )
+        db.session.execute(insert(_occupancy).from_select(['RoomID', 'Kind', 'BookingID', 'Start', 'End'], rows))
+
+
+def _project(connection, kind: str, booking_id: int, room_id: int, start: datetime, end: datetime, status: str):
+    connection.execute(delete(_occupancy).where(_occupancy.c.Kind == kind, _occupancy.c.BookingID == booking_id))
+    if status in ACTIVE_STATUSES:
+        connection.execute(insert(_occupancy).values(
+            RoomID=room_id, Kind=kind, BookingID=booking_id, Start=start, End=end
+        ))
+
+
+@event.listens_for(RoomBooking, 'after_insert')
+@event.listens_for(RoomBooking, 'after_update')
+def _project_room_booking(mapper, connection, target):
+    _project(connection, 'room', target.RBookID, target.RoomID, target.Start, target.End, target.RBookStatus)
+
+
+@event.listens_for(EventBooking, 'after_insert')
+@event.listens_for(EventBooking, 'after_update')
+def _project_event_booking(mapper, connection, target):
+    _project(connection, 'event', target.EBookID, target.RoomID, target.Start, target.End, target.EbookStatus)
+
+
+@event.listens_for(RoomBooking, 'after_delete')
+def _remove_room_booking(mapper, connection, target):
+    connection.execute(delete(_occupancy).where(_occupancy.c.Kind == 'room', _occupancy.c.BookingID == target.RBookID))
+
+
+@event.listens_for(EventBooking, 'after_delete')
+def _remove_event_booking(mapper, connection, target):
+    connection.execute(delete(_occupancy).where(_occupancy.c.Kind == 'event', _occupancy.c.BookingID == target.EBookID))
@@ -0,0 +1,252 @@
+"""Bulk timetable import and export."""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert, literal
+from ..models.room import RoomList, RoomBooking, EventBooking
+from ..models.base import db
+from ..schemas.booking_schema import RoomBookingCreateSchema, EventBookingCreateSchema
+from .availability_index import availability_index
+from .booking_service import BookingService, find_overlaps
+from .occupancy_service import ACTIVE_STATUSES, OccupancyService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# CSV columns, in order (JSON Lines objects use the same keys)
+FIELDS = ['Type', 'RoomName', 'StudID', 'StaffID', 'Start', 'End', 'Purpose', 'AddDetail']
+
+# csv, or JSON Lines: one booking object per line, so both directions stream
+FORMATS = ('csv', 'jsonl')
+
+# Export chunk size in characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# (line number, model, column values, room name)
+ImportRow = Tuple[int, type, Dict, str]
+
+
+class TimetableService:
+    """Service for importing and exporting bookings in bulk."""
+    
+    @staticmethod
+    def read_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """
+        Yield (line number, row) from an uploaded file, one row at a time.
+        
+        Rows that aren't JSON objects are yielded as None.
+        
+        Raises:
+            ValueError: If the format is unsupported
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_num, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_num, row if isinstance(row, dict) else None
+    
+    @staticmethod
+    def import_bookings(stream: IO[bytes], fmt: str, batch_size: int = None) -> Dict:
+        """
+        Import bookings from a CSV or JSON Lines timetable.
+        
+        Rows are validated with the booking create schemas as they are read
+        and inserted in batches: per batch, the rooms are locked, existing
+        bookings are read with one room occupancy range query, all rows are
+        checked for clashes in one vectorized pass, and the free ones are
+        inserted with executemany and committed. Rows that are invalid or
+        clash (with stored bookings or earlier rows) are skipped and
+        reported; the rest of the file is still imported.
+        
+        Args:
+            stream: Binary file stream
+            fmt: 'csv' or 'jsonl'
+            batch_size: Rows per transaction (default TIMETABLE_IMPORT_BATCH_SIZE)
+        
+        Returns:
+            {'created': n, 'conflicts': [(line, message)], 'errors': [(line, message)]}
+        """
+        batch_size = batch_size or current_app.config.get('TIMETABLE_IMPORT_BATCH_SIZE', 500)
+        room_ids = dict(db.session.query(RoomList.RoomName, RoomList.RoomID).all())
+        result = {'created': 0, 'conflicts': [], 'errors': []}
+        
+        batch: List[ImportRow] = []
+        for line_num, row in TimetableService.read_rows(stream, fmt):
+            try:
+                batch.append(TimetableService._validate(line_num, row, room_ids))
+            except ValueError as e:
+                result['errors'].append((line_num, str(e)))
+                continue
+            
+            if len(batch) >= batch_size:
+                TimetableService._insert_batch(batch, result)
+                batch = []
+        if batch:
+            TimetableService._insert_batch(batch, result)
+        
+        logger.info(f"Timetable imported: {result['created']} created, {len(result['conflicts'])} conflicts, "
+                    f"{len(result['errors'])} errors")
+        return result
+    
+    @staticmethod
+    def _validate(line_num: int, row: Optional[Dict], room_ids: Dict[str, int]) -> ImportRow:
+        """
+        Turn a file row into booking column values.
+        
+        Raises:
+            ValueError: If the row is malformed, names an unknown room or fails schema validation
+        """
+        if row is None:
+            raise ValueError("Not a JSON object")
+        
+        kind = (row.get('Type') or 'room').strip().lower()
+        if kind not in ('room', 'event'):
+            raise ValueError(f"Unknown Type: {row.get('Type')}")
+        
+        room_name = (row.get('RoomName') or '').strip()
+        if room_name not in room_ids:
+            raise ValueError(f"Unknown room: {room_name}")
+        
+        fields = ['StudID', 'StaffID', 'Start', 'End', 'Purpose'] + (['AddDetail'] if kind == 'event' else [])
+        data = {field: row[field] for field in fields if row.get(field) not in (None, '')}
+        data['RoomID'] = room_ids[room_name]
+        
+        schema = EventBookingCreateSchema() if kind == 'event' else RoomBookingCreateSchema()
+        try:
+            values = schema.load(data)
+        except ValidationError as e:
+            raise ValueError("; ".join(f"{field}: {', '.join(messages)}" for field, messages in e.messages.items()))
+        
+        if kind == 'event':
+            return line_num, EventBooking, dict(values, EbookStatus='Upcoming'), room_name
+        return line_num, RoomBooking, dict(values, RBookStatus='Upcoming'), room_name
+    
+    @staticmethod
+    def _insert_batch(batch: List[ImportRow], result: Dict):
+        """Insert a batch's non-clashing rows in one transaction."""
+        room_ids = sorted({values['RoomID'] for _, _, values, _ in batch})
+        window_start = min(values['Start'] for _, _, values, _ in batch)
+        window_end = max(values['End'] for _, _, values, _ in batch)
+        
+        # Start a fresh transaction so the clash check below reads a snapshot
+        # taken after the locks (see BookingService._lock_room)
+        db.session.commit()
+        try:
+            # Same lock as single bookings; a fixed order avoids deadlocks between imports
+            for room_id in room_ids:
+                BookingService._lock_room(room_id)
+            
+            booked = defaultdict(list)
+            for room_id, _, _, start, end in OccupancyService.overlapping(room_ids, window_start, window_end):
+                booked[room_id].append((start, end))
+            
+            by_room = defaultdict(list)
+            for entry in batch:
+                by_room[entry[2]['RoomID']].append(entry)
+            
+            inserts = {RoomBooking: [], EventBooking: []}
+            for room_id, entries in by_room.items():
+                clashes = find_overlaps(booked[room_id], [(values['Start'], values['End']) for _, _, values, _ in entries])
+                accepted = []
+                for (line_num, model, values, room_name), clash in zip(entries, clashes):
+                    start, end = values['Start'], values['End']
+                    if clash or any(s <= end and e >= start for s, e in accepted):
+                        result['conflicts'].append((line_num, f"{room_name} is already booked for {start} - {end}"))
+                        continue
+                    accepted.append((start, end))
+                    inserts[model].append(values)
+            
+            for model, rows in inserts.items():
+                if rows:
+                    # executemany skips the mapper events that keep roomoccupancy in sync,
+                    # so project the new rows (the room locks keep the ID range ours)
+                    after_id = OccupancyService.last_booking_id(model)
+                    db.session.execute(insert(model), rows)
+                    OccupancyService.project_inserted(model, sorted({values['RoomID'] for values in rows}), after_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        # Bulk inserts bypass the session's flush events, so drop the rooms here
+        for room_id in room_ids:
+            availability_index.invalidate(room_id)
+        result['created'] += sum(len(rows) for rows in inserts.values())
+    
+    @staticmethod
+    def export_bookings(fmt: str, start: datetime = None, end: datetime = None) -> Iterator[str]:
+        """
+        Yield an export of active room and event bookings in import format,
+        in chunks, reading the database in batches.
+        
+        Args:
+            fmt: 'csv' or 'jsonl'
+            start: Only bookings ending at or after this time
+            end: Only bookings starting at or before this time
+        
+        Raises:
+            ValueError: If the format is unsupported
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        return TimetableService._export_chunks(fmt, TimetableService._export_rows(start, end))
+    
+    @staticmethod
+    def _export_rows(start: Optional[datetime], end: Optional[datetime]) -> Iterator[Dict]:
+        for kind, model, status in (('room', RoomBooking, RoomBooking.RBookStatus),
+                                    ('event', EventBooking, EventBooking.EbookStatus)):
+            add_detail = EventBooking.AddDetail if model is EventBooking else literal(None)
+            query = db.session.query(
+                RoomList.RoomName, model.StudID, model.StaffID, model.Start, model.End, model.Purpose,
+                add_detail.label('AddDetail')
+            ).join(RoomList, RoomList.RoomID == model.RoomID).filter(status.in_(ACTIVE_STATUSES))
+            if start:
+                query = query.filter(model.End >= start)
+            if end:
+                query = query.filter(model.Start <= end)
+            
+            for row in query.order_by(model.Start).yield_per(1000):
+                yield {
+                    'Type': kind,
+                    'RoomName': row.RoomName,
+                    'StudID': row.StudID,
+                    'StaffID': row.StaffID,
+                    'Start': row.Start.isoformat(),
+                    'End': row.End.isoformat(),
+                    'Purpose': row.Purpose,
+                    'AddDetail': row.AddDetail
+                }
+    
+    @staticmethod
+    def _export_chunks(fmt: str, rows: Iterator[Dict]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, FIELDS) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        for row in rows:
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row) + '\n')
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()